@@ -1,17 +1,23 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
 from contextlib import ExitStack
+from datetime import date
+from itertools import islice
 from pathlib import Path
 import asyncio
+import logging
 import time
 from typing import Protocol
 from uuid import uuid4
 import ipaddress
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
-from fastapi.responses import FileResponse
-from PIL import Image as PilImage, UnidentifiedImageError
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import FileResponse, StreamingResponse
+from PIL import Image as PilImage, ImageSequence, UnidentifiedImageError
 from pillow_heif import register_heif_opener
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from sqlalchemy import update, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -22,10 +28,29 @@ from app.db.session import get_db_session
 from app.deps.auth import require_admin
 from app.models.image import Image
 from app.models.message import Message
-from app.schemas.box import DeleteRequest, MessageListResponse, TagFilterRequest, UploadResponse
+from app.schemas.box import (
+    DeleteRequest,
+    MessageHistoryResponse,
+    MessageItem,
+    MessageListResponse,
+    MessageSearchItem,
+    MessageSearchResponse,
+    TagFilterRequest,
+    UploadResponse,
+)
+from app.services import box_feed
 from app.services.auth_service import AuthService
+from app.services.image_hash import DeletedImageIndex, dhash, record_deleted_hashes
+from app.services.message_archive import list_history, parse_history_cursor
+from app.services.message_search import (
+    MessageSearchFilters,
+    highlight_offsets,
+    parse_search_terms,
+    search_messages,
+)
 
 router = APIRouter(prefix="/box")
+logger = logging.getLogger(__name__)
 
 
 class AsyncScriptRedis(Protocol):
@@ -69,6 +94,14 @@ MAX_UPLOAD_FILES = 6
 MAX_UPLOAD_BYTES = 10 * 1024 * 1024
 MAX_UPLOAD_REQUEST_BYTES = 50 * 1024 * 1024
 MAX_DECODED_IMAGE_PIXELS = 25_000_000
+THUMB_SIZE = (300, 300)
+GIF_PREVIEW_SIZE = (480, 480)
+GIF_PREVIEW_MAX_FRAMES = 60
+GIF_DEFAULT_FRAME_DURATION_MS = 100
+FEED_HEARTBEAT_SECONDS = 15
+FEED_RETRY_MILLISECONDS = 3000
+
+deleted_images = DeletedImageIndex(get_settings().box_duplicate_hash_distance)
 
 RATE_LIMIT_WINDOWS = (
     (30, 1),
@@ -139,12 +172,50 @@ def _resolve_upload_path(path: str, allowed_dir: Path) -> Path:
     return full_path
 
 
+def render_gif_previews(
+    original_path: Path,
+    filename_base: str,
+    generated_paths: list[Path],
+) -> tuple[Path, Path, int]:
+    with PilImage.open(original_path) as image:
+        first_frame = image.convert("RGBA")
+        flattened = PilImage.new("RGB", first_frame.size, "white")
+        flattened.paste(first_frame, mask=first_frame.getchannel("A"))
+        phash = dhash(flattened)
+
+        flattened.thumbnail(THUMB_SIZE)
+        thumb_path = THUMB_DIR / f"{filename_base}-thumb.jpg"
+        generated_paths.append(thumb_path)
+        flattened.save(thumb_path, format="JPEG", quality=70, optimize=True)
+
+        frames: list[PilImage.Image] = []
+        durations: list[int] = []
+        for frame in islice(ImageSequence.Iterator(image), GIF_PREVIEW_MAX_FRAMES):
+            preview_frame = frame.convert("RGBA")
+            preview_frame.thumbnail(GIF_PREVIEW_SIZE)
+            frames.append(preview_frame)
+            durations.append(int(frame.info.get("duration") or GIF_DEFAULT_FRAME_DURATION_MS))
+        preview_path = JPG_DIR / f"{filename_base}-preview.gif"
+        generated_paths.append(preview_path)
+        frames[0].save(
+            preview_path,
+            format="GIF",
+            save_all=True,
+            append_images=frames[1:],
+            duration=durations,
+            loop=image.info.get("loop", 0),
+            disposal=2,
+            optimize=True,
+        )
+    return thumb_path, preview_path, phash
+
+
 def process_uploaded_image(
     raw_bytes: bytes,
     file_suffix: str,
     content_type: str,
     filename_base: str,
-) -> tuple[Path, Path, Path]:
+) -> tuple[Path, Path, Path, int]:
     original_path = ORIGINAL_DIR / f"{filename_base}-original{file_suffix}"
     jpg_path = original_path
     thumb_path = original_path
@@ -166,19 +237,23 @@ def process_uploaded_image(
                 )
             if is_gif:
                 _ = image.verify()
-                return original_path, jpg_path, thumb_path
-            _ = image.load()
-            rgb_image = image.convert("RGB")
-
-            jpg_path = JPG_DIR / f"{filename_base}-jpg.jpg"
-            generated_paths.append(jpg_path)
-            rgb_image.save(jpg_path, format="JPEG", quality=90, optimize=True)
-
-            thumb_image = rgb_image.copy()
-            thumb_image.thumbnail((300, 300))
-            thumb_path = THUMB_DIR / f"{filename_base}-thumb.jpg"
-            generated_paths.append(thumb_path)
-            thumb_image.save(thumb_path, format="JPEG", quality=70, optimize=True)
+            else:
+                _ = image.load()
+                rgb_image = image.convert("RGB")
+                phash = dhash(rgb_image)
+
+                jpg_path = JPG_DIR / f"{filename_base}-jpg.jpg"
+                generated_paths.append(jpg_path)
+                rgb_image.save(jpg_path, format="JPEG", quality=90, optimize=True)
+
+                thumb_image = rgb_image.copy()
+                thumb_image.thumbnail(THUMB_SIZE)
+                thumb_path = THUMB_DIR / f"{filename_base}-thumb.jpg"
+                generated_paths.append(thumb_path)
+                thumb_image.save(thumb_path, format="JPEG", quality=70, optimize=True)
+
+        if is_gif:
+            thumb_path, jpg_path, phash = render_gif_previews(original_path, filename_base, generated_paths)
     except PilImage.DecompressionBombError as exc:
         original_path.unlink(missing_ok=True)
         for path in generated_paths:
@@ -199,7 +274,7 @@ def process_uploaded_image(
             detail={"error": "unsupported_image_format"},
         ) from exc
 
-    return original_path, jpg_path, thumb_path
+    return original_path, jpg_path, thumb_path, phash
 
 
 async def _enforce_upload_rate_limit(redis: AsyncScriptRedis, client_ip: str) -> None:
@@ -234,7 +309,7 @@ async def upload_message(
     tag: str | None = Form(default=None),
     files: list[UploadFile] | None = File(default=None),
     session: AsyncSession = Depends(get_db_session),
-    redis: AsyncScriptRedis = Depends(get_redis_client),
+    redis: Redis = Depends(get_redis_client),
 ) -> UploadResponse:
     peer_ip = request.client.host if request.client else "0.0.0.0"
     client_ip = peer_ip
@@ -292,16 +367,18 @@ async def upload_message(
     THUMB_DIR.mkdir(parents=True, exist_ok=True)
     JPG_DIR.mkdir(parents=True, exist_ok=True)
 
+    settings = get_settings()
+    deleted_image_index = await deleted_images.sync(session, redis)
     with ExitStack() as file_cleanup:
         message_row = Message(ip_address=ip_value, message_text=message_value, tag=tag_value)
         session.add(message_row)
         await session.flush()
 
-        image_ids: list[int] = []
+        image_rows: list[Image] = []
         for raw_bytes, file_suffix, content_type in prepared_files:
             file_id = uuid4().hex
             filename_base = f"{message_row.message_id}-{file_id}"
-            original_path, jpg_path, thumb_path = await asyncio.to_thread(
+            original_path, jpg_path, thumb_path, phash = await asyncio.to_thread(
                 process_uploaded_image,
                 raw_bytes,
                 file_suffix,
@@ -310,20 +387,97 @@ async def upload_message(
             )
             for path in {original_path, jpg_path, thumb_path}:
                 file_cleanup.callback(path.unlink, missing_ok=True)
+            duplicate = deleted_image_index.nearest(phash)
+            if duplicate is not None and settings.box_duplicate_image_action == "reject":
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={"error": "duplicate_image", "duplicate_of": duplicate[0]},
+                )
 
             image_row = Image(
                 message_id=message_row.message_id,
                 image_path=str(original_path),
                 thumb_path=str(thumb_path),
                 jpg_path=str(jpg_path),
+                phash=phash,
+                duplicate_of=duplicate[0] if duplicate is not None else None,
             )
             session.add(image_row)
             await session.flush()
-            image_ids.append(image_row.image_id)
+            image_rows.append(image_row)
 
         await session.commit()
         _ = file_cleanup.pop_all()
-    return UploadResponse(message_id=message_row.message_id, image_ids=image_ids, code=0)
+    await _publish_to_feed(session, redis, message_row, image_rows)
+    return UploadResponse(
+        message_id=message_row.message_id,
+        image_ids=[image_row.image_id for image_row in image_rows],
+        code=0,
+    )
+
+
+async def _publish_to_feed(
+    session: AsyncSession,
+    redis: Redis,
+    message_row: Message,
+    image_rows: list[Image],
+) -> None:
+    await session.refresh(message_row, ["created_at", "status"])
+    item = MessageItem(
+        id=message_row.message_id,
+        created_at=message_row.created_at,
+        msg=message_row.message_text,
+        tag=message_row.tag,
+        images=[image_row.image_path for image_row in image_rows],
+        images_thumb=[image_row.thumb_path for image_row in image_rows],
+        images_jpg=[image_row.jpg_path for image_row in image_rows],
+        images_duplicate_of=[image_row.duplicate_of for image_row in image_rows],
+    )
+    try:
+        _ = await box_feed.publish_message(
+            redis,
+            {**item.model_dump(mode="json"), "status": message_row.status},
+        )
+    except RedisError:
+        logger.warning("[box-feed] 留言 %s 推送失败", message_row.message_id, exc_info=True)
+
+
+@router.get("/feed")
+async def message_feed(
+    request: Request,
+    last_event_id: str | None = None,
+    redis: Redis = Depends(get_redis_client),
+    _: None = Depends(require_token),
+) -> StreamingResponse:
+    resume_from = request.headers.get("last-event-id") or last_event_id
+
+    async def events() -> AsyncIterator[str]:
+        async with box_feed.broker.subscribe() as subscription:
+            yield f"retry: {FEED_RETRY_MILLISECONDS}\n\n"
+            last_key: tuple[int, int] | None = None
+            if resume_from:
+                for event in await box_feed.replay_since(redis, resume_from):
+                    last_key = box_feed.stream_id_key(event.id)
+                    yield event.encode()
+            while not subscription.overflowed:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), FEED_HEARTBEAT_SECONDS)
+                except TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                event_key = box_feed.stream_id_key(event.id)
+                if last_key is not None and event_key is not None and event_key <= last_key:
+                    continue
+                last_key = event_key
+                yield event.encode()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/image/original")
@@ -384,6 +538,65 @@ async def list_approved(
     return MessageListResponse.from_messages(list(messages))
 
 
+@router.get("/search", response_model=MessageSearchResponse)
+async def search(
+    q: str = Query(min_length=1, max_length=200),
+    status_filter: str | None = Query(
+        default=None,
+        alias="status",
+        pattern="^(pending|approved|archived|delete)$",
+    ),
+    tag: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(30, ge=1, le=100),
+    session: AsyncSession = Depends(get_db_session),
+    _: None = Depends(require_token),
+) -> MessageSearchResponse:
+    terms = parse_search_terms(q)
+    if not terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "empty_query"},
+        )
+    filters = MessageSearchFilters(status=status_filter, tag=tag, start=start, end=end)
+    messages, total = await search_messages(session, terms, filters, page, page_size)
+    items = [
+        MessageSearchItem(
+            **item.model_dump(),
+            status=message.status,
+            highlights=highlight_offsets(message.message_text, terms),
+        )
+        for message, item in zip(messages, MessageListResponse.from_messages(messages).items)
+    ]
+    return MessageSearchResponse(items=items, total=total, page=page, page_size=page_size)
+
+
+@router.get("/history", response_model=MessageHistoryResponse)
+async def history(
+    status_filter: str | None = Query(
+        default=None,
+        alias="status",
+        pattern="^(pending|approved|archived|delete)$",
+    ),
+    tag: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    before: str | None = None,
+    page_size: int = Query(30, ge=1, le=100),
+    session: AsyncSession = Depends(get_db_session),
+    _: None = Depends(require_token),
+) -> MessageHistoryResponse:
+    try:
+        cursor = parse_history_cursor(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+    filters = MessageSearchFilters(status=status_filter, tag=tag, start=start, end=end)
+    items, total, next_before = await list_history(session, filters, cursor, page_size)
+    return MessageHistoryResponse(items=items, total=total, page_size=page_size, next_before=next_before)
+
+
 @router.post("/approve")
 async def approve_all(
     payload: TagFilterRequest | None = None,
@@ -404,6 +617,7 @@ async def approve_all(
 async def delete_message(
     payload: DeleteRequest,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis_client),
     _: None = Depends(require_token),
 ) -> dict[str, int | str]:
     result = await session.execute(
@@ -414,6 +628,10 @@ async def delete_message(
     await session.commit()
     if not result.rowcount:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    hashes = await session.execute(
+        select(Image.image_id, Image.phash).where(Image.message_id == payload.id, Image.phash.is_not(None))
+    )
+    await record_deleted_hashes(redis, [(image_id, phash) for image_id, phash in hashes])
     return {"code": 0, "message": f"id{payload.id}已删除"}
 
 
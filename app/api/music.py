@@ -1,15 +1,35 @@
-from datetime import UTC, datetime
+import json
+from collections.abc import AsyncIterator
+from datetime import UTC, date, datetime
+from typing import Final
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
-from sqlalchemy import func, select
+from fastapi.responses import FileResponse, StreamingResponse
+from redis.asyncio import Redis
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db_session
-from app.models.music import MusicCatalogRevision, Song, SongPerformance
-from app.schemas.music import MusicListResponse, PerformanceOut, SongDetail, SongSummary, StreamModel
+from app.core.redis import get_redis_client
+from app.db.session import async_session_factory, get_db_session
+from app.models.music import Song, SongPerformance
+from app.schemas.music import MusicListResponse, PerformanceOut, SongDetail, SongSummary, StreamModel, StreamSongOut
+from app.services.music_artists import artist_counts
+from app.services.music_catalog import CatalogQuery, store as catalog_store
+from app.services.music_changes import collect_changes
+from app.services.music_export import ExportArtifactStore, negotiate_encoding
+from app.services.music_random import recent_picks, remember_picks, rng, samplers as random_samplers
+from app.services.music_revision import etag_matches, read_revision, revision_etag, tracker
+from app.services.music_rollup import cached_analytics
 
 router = APIRouter()
 
+EXPORT_BATCH_SIZE: Final = 500
+ARTIST_SORT_KEYS: Final = {
+    "name": lambda item: (str(item["artist"]).casefold(), item["artist"]),
+    "songs": lambda item: (-item["songCount"], str(item["artist"]).casefold()),
+    "performances": lambda item: (-item["performanceCount"], str(item["artist"]).casefold()),
+}
+
 
 def _summary(song: Song, count: int, latest: SongPerformance | None) -> SongSummary:
     return SongSummary(
@@ -45,15 +65,14 @@ def _performance(row: SongPerformance) -> PerformanceOut:
     )
 
 
-async def _catalog_revision(response: Response, session: AsyncSession) -> int:
-    revision = (
-        await session.scalar(
-            select(MusicCatalogRevision.revision).where(MusicCatalogRevision.id == 1)
-        )
-        or 0
-    )
-    response.headers["ETag"] = f'W/"music-{revision}"'
-    return revision
+async def _not_modified(request: Request) -> Response | None:
+    revision = await tracker.cached()
+    if revision is None:
+        return None
+    etag = revision_etag(revision)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
 
 
 @router.get("/music", response_model=MusicListResponse)
@@ -61,176 +80,279 @@ async def list_music(
     request: Request,
     response: Response,
     q: str | None = None,
-    search_mode: str = Query("title", pattern="^(title|artist)$"),
+    search_mode: str = Query("title", pattern="^(title|artist|all)$"),
     genre: str | None = None,
     language: str | None = None,
     work_type: str | None = None,
-    sort: str = Query("title", pattern="^(title|recent|count)$"),
+    artist: str | None = None,
+    sort: str | None = Query(None, pattern="^(title|recent|count|relevance)$"),
     order: str = Query("asc", pattern="^(asc|desc)$"),
     page: int = Query(1, ge=1),
     page_size: int = Query(30, ge=1, le=1000),
-    session: AsyncSession = Depends(get_db_session),
 ) -> MusicListResponse | Response:
-    revision = await _catalog_revision(response, session)
-    etag = response.headers["ETag"]
-    if request.headers.get("if-none-match") == etag:
+    if (not_modified := await _not_modified(request)) is not None:
+        return not_modified
+    snapshot = await catalog_store.get()
+    etag = revision_etag(snapshot.revision)
+    if etag_matches(request.headers.get("if-none-match"), etag):
         return Response(status_code=304, headers={"ETag": etag})
-    filters = [Song.status == "active"]
-    if q:
-        search_field = Song.artist if search_mode == "artist" else Song.title
-        filters.append(search_field.ilike(f"%{q}%"))
-    if genre:
-        filters.append(Song.genre == genre)
-    if language:
-        filters.append(Song.language == language)
-    if work_type:
-        filters.append(Song.work_type == work_type)
-
-    total = await session.scalar(select(func.count()).select_from(Song).where(*filters)) or 0
-    count_subquery = (
-        select(func.count(SongPerformance.performance_id))
-        .where(SongPerformance.song_id == Song.song_id)
-        .correlate(Song)
-        .scalar_subquery()
-    )
-    latest_id_subquery = (
-        select(SongPerformance.performance_id)
-        .where(SongPerformance.song_id == Song.song_id)
-        .order_by(SongPerformance.performed_on.desc(), SongPerformance.performance_id.desc())
-        .limit(1)
-        .correlate(Song)
-        .scalar_subquery()
-    )
-    latest_date_subquery = (
-        select(SongPerformance.performed_on)
-        .where(SongPerformance.song_id == Song.song_id)
-        .order_by(SongPerformance.performed_on.desc())
-        .limit(1)
-        .correlate(Song)
-        .scalar_subquery()
-    )
-    ordering_fields = {
-        "title": Song.title,
-        "recent": latest_date_subquery,
-        "count": count_subquery,
-    }
-    ordering = ordering_fields[sort]
-    ordering = ordering.desc() if order == "desc" else ordering.asc()
-    rows = (
-        await session.execute(
-            select(Song, count_subquery, SongPerformance)
-            .outerjoin(SongPerformance, SongPerformance.performance_id == latest_id_subquery)
-            .where(*filters)
-            .order_by(ordering, Song.song_id)
-            .offset((page - 1) * page_size)
-            .limit(page_size)
-        )
-    ).all()
-
-    active_filter = Song.status == "active"
-    facets = {
-        "genres": list(
-            (await session.scalars(select(Song.genre).where(active_filter).distinct().order_by(Song.genre))).all()
-        ),
-        "languages": list(
-            (
-                await session.scalars(
-                    select(Song.language).where(active_filter).distinct().order_by(Song.language)
-                )
-            ).all()
-        ),
-        "workTypes": list(
-            (
-                await session.scalars(
-                    select(Song.work_type).where(active_filter).distinct().order_by(Song.work_type)
-                )
-            ).all()
-        ),
-    }
-    active_total = await session.scalar(select(func.count()).select_from(Song).where(active_filter)) or 0
-    performance_total = (
-        await session.scalar(
-            select(func.count()).select_from(SongPerformance).join(Song).where(active_filter)
-        )
-        or 0
+    response.headers["ETag"] = etag
+    query = CatalogQuery(
+        q=q,
+        search_mode=search_mode,
+        genre=genre,
+        language=language,
+        work_type=work_type,
+        artist=artist,
+        sort=sort or ("relevance" if q else "title"),
+        order=order,
     )
+    items, total = snapshot.query(query, (page - 1) * page_size, page_size)
     return MusicListResponse(
-        items=[_summary(song, count, latest) for song, count, latest in rows],
+        items=items,
         total=total,
         page=page,
         page_size=page_size,
-        facets=facets,
-        stats={"song_count": active_total, "performance_count": performance_total},
-        revision=revision,
+        facets=snapshot.summary.facets,
+        facet_counts=snapshot.summary.facet_counts,
+        stats=snapshot.summary.stats,
+        revision=snapshot.revision,
     )
 
 
-@router.get("/music/export")
-async def export_music(
-    response: Response,
-    session: AsyncSession = Depends(get_db_session),
-) -> dict[str, object]:
-    revision = await _catalog_revision(response, session)
-    songs = list(
-        (await session.scalars(select(Song).where(Song.status == "active").order_by(Song.title))).all()
+def _song_detail(song: Song, history: list[SongPerformance]) -> SongDetail:
+    return SongDetail(
+        **_summary(song, len(history), history[0] if history else None).model_dump(),
+        performances=[_performance(row) for row in history],
     )
-    performances = list(
-        (
-            await session.scalars(
-                select(SongPerformance)
-                .join(Song)
-                .where(Song.status == "active")
-                .order_by(SongPerformance.performed_on.desc())
-            )
-        ).all()
-    )
-    grouped: dict[int, list[SongPerformance]] = {}
-    for performance in performances:
-        grouped.setdefault(performance.song_id, []).append(performance)
-    items = []
-    for song in songs:
-        history = grouped.get(song.song_id, [])
-        items.append(
-            SongDetail(
-                **_summary(song, len(history), history[0] if history else None).model_dump(),
-                performances=[_performance(row) for row in history],
-            ).model_dump()
-        )
-    return {
+
+
+def _export_item(song: Song, history: list[SongPerformance]) -> bytes:
+    return _song_detail(song, history).model_dump_json().encode()
+
+
+async def _export_chunks(session: AsyncSession, revision: int) -> AsyncIterator[bytes]:
+    header = {
         "code": 0,
         "schemaVersion": 1,
         "generatedAt": datetime.now(UTC).isoformat(),
         "revision": revision,
-        "songs": items,
     }
+    yield json.dumps(header, ensure_ascii=False, separators=(",", ":"))[:-1].encode() + b',"songs":['
+    result = await session.stream(
+        select(Song, SongPerformance)
+        .outerjoin(SongPerformance, SongPerformance.song_id == Song.song_id)
+        .where(Song.status == "active")
+        .order_by(
+            Song.title,
+            Song.song_id,
+            SongPerformance.performed_on.desc(),
+            SongPerformance.performance_id.desc(),
+        )
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    separator = b""
+    current: Song | None = None
+    history: list[SongPerformance] = []
+    async for song, performance in result:
+        if current is not None and song.song_id != current.song_id:
+            yield separator + _export_item(current, history)
+            separator = b","
+            history = []
+        current = song
+        if performance is not None:
+            history.append(performance)
+    if current is not None:
+        yield separator + _export_item(current, history)
+    yield b"]}"
 
 
-@router.get("/music/{song_id}")
-async def get_music(
-    song_id: str,
-    response: Response,
+async def _stream_export(session: AsyncSession, revision: int) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in _export_chunks(session, revision):
+            yield chunk
+    finally:
+        await session.close()
+
+
+export_artifacts = ExportArtifactStore(_export_chunks)
+
+
+@router.get("/music/export")
+async def export_music(request: Request, stream: bool = False) -> Response:
+    if (not_modified := await _not_modified(request)) is not None:
+        return not_modified
+    if stream:
+        session = async_session_factory()
+        try:
+            revision = await read_revision(session)
+        except BaseException:
+            await session.close()
+            raise
+        etag = revision_etag(revision)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            await session.close()
+            return Response(status_code=304, headers={"ETag": etag})
+        return StreamingResponse(
+            _stream_export(session, revision), media_type="application/json", headers={"ETag": etag}
+        )
+    artifact = await export_artifacts.current()
+    headers = {"ETag": artifact.etag, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), artifact.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return FileResponse(artifact.paths[encoding], media_type="application/json", headers=headers)
+
+
+@router.get("/music/changes")
+async def music_changes(
+    since: int = Query(ge=0),
     session: AsyncSession = Depends(get_db_session),
-) -> dict[str, int | SongDetail]:
-    await _catalog_revision(response, session)
-    song = await session.scalar(
-        select(Song).where(Song.source_key == song_id, Song.status == "active")
-    )
-    if song is None:
-        raise HTTPException(status_code=404, detail="Song not found")
-    performances = list(
-        (
-            await session.scalars(
-                select(SongPerformance)
-                .where(SongPerformance.song_id == song.song_id)
-                .order_by(SongPerformance.performed_on.desc(), SongPerformance.performance_id.desc())
-            )
-        ).all()
-    )
-    summary = _summary(song, len(performances), performances[0] if performances else None)
+) -> dict[str, object]:
+    changes = await collect_changes(session, since)
+    if changes.full:
+        return {"code": 0, "since": since, "revision": changes.revision, "full": True, "export": "/music/export"}
+    songs: list[SongDetail] = []
+    if changes.song_ids:
+        history: dict[int, list[SongPerformance]] = {}
+        for performance in await session.scalars(
+            select(SongPerformance)
+            .where(SongPerformance.song_id.in_(changes.song_ids))
+            .order_by(SongPerformance.performed_on.desc(), SongPerformance.performance_id.desc())
+        ):
+            history.setdefault(performance.song_id, []).append(performance)
+        for song in await session.scalars(
+            select(Song).where(Song.song_id.in_(changes.song_ids)).order_by(Song.title, Song.song_id)
+        ):
+            songs.append(_song_detail(song, history.get(song.song_id, [])))
     return {
         "code": 0,
-        "item": SongDetail(
-            **summary.model_dump(),
-            performances=[_performance(row) for row in performances],
-        ),
+        "since": since,
+        "revision": changes.revision,
+        "full": False,
+        "songs": {"upserted": songs, "removed": changes.removed_songs},
+        "performances": {"upserted": changes.upserted_performances, "removed": changes.removed_performances},
     }
+
+
+@router.get("/music/random")
+async def random_music(
+    response: Response,
+    genre: str | None = None,
+    language: str | None = None,
+    work_type: str | None = None,
+    artist: str | None = None,
+    weight: str = Query("uniform", pattern="^(uniform|inverse_count|days_since)$"),
+    count: int = Query(1, ge=1, le=20),
+    no_repeat: int = Query(0, ge=0, le=500),
+    client: str | None = Query(None, pattern="^[A-Za-z0-9_-]{1,64}$"),
+    redis: Redis = Depends(get_redis_client),
+) -> dict[str, object]:
+    if no_repeat and client is None:
+        raise HTTPException(status_code=400, detail="client is required when no_repeat is set")
+    snapshot = await catalog_store.get()
+    query = CatalogQuery(genre=genre, language=language, work_type=work_type, artist=artist)
+    sampler = random_samplers.get(snapshot, query, weight, date.today())
+    excluded = set(await recent_picks(redis, client, no_repeat)) if client and no_repeat else set()
+    items: list[SongSummary] = []
+    for _ in range(count):
+        index = sampler.pick(rng, excluded)
+        if index is None:
+            break
+        items.append(snapshot.summaries[index])
+        excluded.add(snapshot.summaries[index].song_id)
+    if client and no_repeat and items:
+        await remember_picks(redis, client, [item.song_id for item in items], no_repeat)
+    response.headers["Cache-Control"] = "no-store"
+    return {"code": 0, "revision": snapshot.revision, "candidates": len(sampler), "items": items}
+
+
+@router.get("/music/artists", response_model=None)
+async def list_artists(
+    request: Request,
+    response: Response,
+    sort: str = Query("songs", pattern="^(name|songs|performances)$"),
+    redis: Redis = Depends(get_redis_client),
+) -> dict[str, object] | Response:
+    if (not_modified := await _not_modified(request)) is not None:
+        return not_modified
+    revision, items = await cached_analytics(redis, "artists", (), artist_counts)
+    etag = revision_etag(revision)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return {"code": 0, "revision": revision, "total": len(items), "items": sorted(items, key=ARTIST_SORT_KEYS[sort])}
+
+
+@router.get("/music/streams/{stream_id}", response_model=None)
+async def stream_songs(
+    stream_id: str,
+    request: Request,
+    response: Response,
+) -> dict[str, object] | Response:
+    if (not_modified := await _not_modified(request)) is not None:
+        return not_modified
+    async with async_session_factory() as session:
+        revision = await tracker.resolve(session)
+        etag = revision_etag(revision)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        rows = (
+            await session.execute(
+                select(SongPerformance, Song)
+                .join(Song, Song.song_id == SongPerformance.song_id)
+                .where(SongPerformance.stream_id == stream_id, Song.status == "active")
+                .order_by(SongPerformance.performed_on, SongPerformance.performance_id)
+            )
+        ).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    items = [
+        StreamSongOut(
+            song_id=song.song_id,
+            id=song.source_key,
+            title=song.title,
+            artist=song.artist,
+            genre=song.genre,
+            language=song.language,
+            workType=song.work_type,
+            performanceCount=song.performance_count,
+            performance=_performance(performance),
+        )
+        for performance, song in rows
+    ]
+    return {"code": 0, "stream_id": stream_id, "items": items}
+
+
+@router.get("/music/{song_id}", response_model=None)
+async def get_music(
+    song_id: str,
+    request: Request,
+    response: Response,
+) -> dict[str, int | SongDetail] | Response:
+    if (not_modified := await _not_modified(request)) is not None:
+        return not_modified
+    async with async_session_factory() as session:
+        revision = await tracker.resolve(session)
+        etag = revision_etag(revision)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        song = await session.scalar(
+            select(Song).where(Song.source_key == song_id, Song.status == "active")
+        )
+        if song is None:
+            raise HTTPException(status_code=404, detail="Song not found")
+        performances = list(
+            (
+                await session.scalars(
+                    select(SongPerformance)
+                    .where(SongPerformance.song_id == song.song_id)
+                    .order_by(SongPerformance.performed_on.desc(), SongPerformance.performance_id.desc())
+                )
+            ).all()
+        )
+    return {"code": 0, "item": _song_detail(song, performances)}
@@ -0,0 +1,93 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from redis.asyncio import Redis
+
+from app.api.music import _not_modified
+from app.core.redis import get_redis_client
+from app.services.music_revision import etag_matches, revision_etag
+from app.services.music_rollup import cached_analytics, debut_songs, month_range, monthly_counts, shift_month, top_songs
+from app.services.partitions import month_key
+
+router = APIRouter(prefix="/music/analytics")
+
+
+def _period(period: str, year: int | None, month: int | None) -> tuple[int, int]:
+    today = date.today()
+    return month_range(year or today.year, (month or today.month) if period == "month" else None)
+
+
+def _response(
+    request: Request,
+    response: Response,
+    revision: int,
+    first_month: int,
+    last_month: int,
+    items: list[dict[str, object]],
+) -> dict[str, object] | Response:
+    etag = revision_etag(revision)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return {"code": 0, "revision": revision, "start": first_month, "end": last_month, "items": items}
+
+
+@router.get("/top", response_model=None)
+async def top(
+    request: Request,
+    response: Response,
+    period: str = Query("month", pattern="^(month|year)$"),
+    year: int | None = Query(None, ge=2000, le=9999),
+    month: int | None = Query(None, ge=1, le=12),
+    limit: int = Query(20, ge=1, le=100),
+    redis: Redis = Depends(get_redis_client),
+) -> dict[str, object] | Response:
+    if (not_modified := await _not_modified(request)) is not None:
+        return not_modified
+    first_month, last_month = _period(period, year, month)
+    revision, items = await cached_analytics(
+        redis, "top", (first_month, last_month, limit),
+        lambda session: top_songs(session, first_month, last_month, limit),
+    )
+    return _response(request, response, revision, first_month, last_month, items)
+
+
+@router.get("/debuts", response_model=None)
+async def debuts(
+    request: Request,
+    response: Response,
+    period: str = Query("month", pattern="^(month|year)$"),
+    year: int | None = Query(None, ge=2000, le=9999),
+    month: int | None = Query(None, ge=1, le=12),
+    redis: Redis = Depends(get_redis_client),
+) -> dict[str, object] | Response:
+    if (not_modified := await _not_modified(request)) is not None:
+        return not_modified
+    first_month, last_month = _period(period, year, month)
+    revision, items = await cached_analytics(
+        redis, "debuts", (first_month, last_month),
+        lambda session: debut_songs(session, first_month, last_month),
+    )
+    return _response(request, response, revision, first_month, last_month, items)
+
+
+@router.get("/monthly", response_model=None)
+async def monthly(
+    request: Request,
+    response: Response,
+    dimension: str = Query("genre", pattern="^(genre|language)$"),
+    start: int | None = Query(None, ge=200001, le=999912),
+    end: int | None = Query(None, ge=200001, le=999912),
+    redis: Redis = Depends(get_redis_client),
+) -> dict[str, object] | Response:
+    last_month = end or month_key(date.today())
+    first_month = start or shift_month(last_month, -11)
+    if not 1 <= first_month % 100 <= 12 or not 1 <= last_month % 100 <= 12 or first_month > last_month:
+        raise HTTPException(status_code=400, detail="Invalid month range")
+    if (not_modified := await _not_modified(request)) is not None:
+        return not_modified
+    revision, items = await cached_analytics(
+        redis, f"monthly:{dimension}", (first_month, last_month),
+        lambda session: monthly_counts(session, dimension, first_month, last_month),
+    )
+    return _response(request, response, revision, first_month, last_month, items)
@@ -0,0 +1,282 @@
+from collections import defaultdict
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_db_session
+from app.deps.auth import Principal, require_music_manage
+from app.models.music import MusicAuditEvent, Song, SongPerformance
+from app.schemas.music import (
+    BatchRequest,
+    PerformanceCreateOperation,
+    PerformanceDeleteOperation,
+    PerformanceUpdateOperation,
+    SongCreateOperation,
+    SongStatusOperation,
+    SongUpdateOperation,
+)
+from app.services.music_aggregates import refresh_song_aggregates
+from app.services.music_artists import replace_song_artists, song_artist_names
+from app.services.music_identifiers import derive_stream_id, generate_music_source_key
+from app.services.music_revision import pending_revision, publish_revision
+from app.services.music_titles import normalize_title, title_key_values
+
+
+router = APIRouter(prefix="/music-manage")
+MusicPrincipalDep = Annotated[Principal, Depends(require_music_manage)]
+DatabaseSessionDep = Annotated[AsyncSession, Depends(get_db_session)]
+SONG_STATUS_ACTIONS = {"song.archive": ("archived", "song.archived"), "song.restore": ("active", "song.restored")}
+
+
+def _batch_error(status_code: int, error: str, index: int) -> HTTPException:
+    return HTTPException(status_code=status_code, detail={"error": error, "index": index})
+
+
+def _performance_values(operation: PerformanceCreateOperation | PerformanceUpdateOperation) -> dict[str, object]:
+    return {
+        "performed_on": operation.date,
+        "platform": operation.platform,
+        "stream_id": derive_stream_id(operation.stream_url, operation.clip_url),
+        "stream_title": operation.stream_title,
+        "stream_url": operation.stream_url,
+        "clip_url": operation.clip_url,
+    }
+
+
+@router.post("/batch")
+async def batch(
+    payload: BatchRequest,
+    principal: MusicPrincipalDep,
+    session: DatabaseSessionDep,
+) -> dict[str, object]:
+    operations = payload.operations
+    performance_ids = {
+        operation.performance_id
+        for operation in operations
+        if isinstance(operation, PerformanceUpdateOperation | PerformanceDeleteOperation)
+    }
+    song_ids = {
+        operation.song_id
+        for operation in operations
+        if isinstance(operation, SongUpdateOperation | SongStatusOperation | PerformanceCreateOperation)
+        and operation.song_id is not None
+    }
+    if performance_ids:
+        song_ids.update(
+            (
+                await session.scalars(
+                    select(SongPerformance.song_id).where(SongPerformance.performance_id.in_(performance_ids))
+                )
+            ).all()
+        )
+    songs: dict[int, Song] = {}
+    if song_ids:
+        songs = {
+            song.song_id: song
+            for song in await session.scalars(
+                select(Song).where(Song.song_id.in_(song_ids)).order_by(Song.song_id).with_for_update()
+            )
+        }
+    performances: dict[int, SongPerformance] = {}
+    if performance_ids:
+        performances = {
+            row.performance_id: row
+            for row in await session.scalars(
+                select(SongPerformance)
+                .where(SongPerformance.performance_id.in_(performance_ids))
+                .execution_options(populate_existing=True)
+            )
+        }
+
+    song_keys = {song_id: song.source_key for song_id, song in songs.items()}
+    versions = {song.source_key: song.version for song in songs.values()}
+    statuses = {song.source_key: song.status for song in songs.values()}
+    refs: dict[str, str] = {}
+    new_songs: list[dict[str, object]] = []
+    song_values: dict[str, dict[str, object]] = defaultdict(dict)
+    new_performances: list[dict[str, object]] = []
+    performance_values: dict[int, dict[str, object]] = {}
+    deleted_performances: set[int] = set()
+    touched_songs: set[str] = set()
+    audits: list[tuple[str, str, str, dict[str, object], str | None]] = []
+    results: list[dict[str, object]] = []
+
+    def advance(index: int, song_key: str | None, version: int) -> int:
+        if song_key is None or song_key not in versions:
+            raise _batch_error(404, "song_not_found", index)
+        if versions[song_key] != version:
+            raise _batch_error(409, "version_conflict", index)
+        versions[song_key] = version + 1
+        return version + 1
+
+    def existing_performance(index: int, performance_id: int) -> SongPerformance:
+        row = performances.get(performance_id)
+        if row is None or performance_id in deleted_performances:
+            raise _batch_error(404, "performance_not_found", index)
+        return row
+
+    for index, operation in enumerate(operations):
+        if isinstance(operation, SongCreateOperation):
+            song_key = generate_music_source_key("song")
+            if operation.ref is not None:
+                if operation.ref in refs:
+                    raise _batch_error(422, "duplicate_ref", index)
+                refs[operation.ref] = song_key
+            new_songs.append(
+                {
+                    "source_key": song_key,
+                    **operation.model_dump(exclude={"op", "ref"}),
+                    "title_key": normalize_title(operation.title),
+                    "status": "active",
+                    "version": 1,
+                    "performance_count": 0,
+                }
+            )
+            versions[song_key], statuses[song_key] = 1, "active"
+            audits.append(("song.created", "song", song_key, {}, None))
+            results.append({"index": index, "op": operation.op, "source_key": song_key, "version": 1})
+        elif isinstance(operation, SongUpdateOperation):
+            song_key = song_keys.get(operation.song_id)
+            version = advance(index, song_key, operation.version)
+            values = operation.model_dump(exclude_unset=True, exclude={"op", "song_id", "version"})
+            song_values[song_key].update(values, **title_key_values(values))
+            audits.append(("song.updated", "song", song_key, {"changed": values}, None))
+            results.append({"index": index, "op": operation.op, "song_id": operation.song_id, "version": version})
+        elif isinstance(operation, SongStatusOperation):
+            desired, action = SONG_STATUS_ACTIONS[operation.op]
+            song_key = song_keys.get(operation.song_id)
+            version = advance(index, song_key, operation.version)
+            audits.append((action, "song", song_key, {"before": statuses[song_key], "after": desired}, None))
+            song_values[song_key]["status"] = statuses[song_key] = desired
+            results.append({"index": index, "op": operation.op, "song_id": operation.song_id, "version": version})
+        elif isinstance(operation, PerformanceCreateOperation):
+            if operation.song_ref is not None:
+                song_key = refs.get(operation.song_ref)
+            else:
+                song_key = song_keys.get(operation.song_id) if operation.song_id is not None else None
+            version = advance(index, song_key, operation.version)
+            performance_key = generate_music_source_key("performance")
+            new_performances.append({"source_key": performance_key, "song_key": song_key, **_performance_values(operation)})
+            touched_songs.add(song_key)
+            details = {"after": {"date": str(operation.date), "platform": operation.platform}}
+            audits.append(("performance.created", "performance", performance_key, details, song_key))
+            results.append({"index": index, "op": operation.op, "source_key": performance_key, "song_key": song_key, "version": version})
+        elif isinstance(operation, PerformanceUpdateOperation):
+            row = existing_performance(index, operation.performance_id)
+            song_key = song_keys[row.song_id]
+            version = advance(index, song_key, operation.version)
+            current = performance_values.get(row.performance_id, {})
+            before = {
+                "source_key": row.source_key,
+                "date": str(current.get("performed_on", row.performed_on)),
+                "platform": current.get("platform", row.platform),
+                "clip_url": current.get("clip_url", row.clip_url),
+            }
+            values = _performance_values(operation)
+            performance_values[row.performance_id] = values
+            touched_songs.add(song_key)
+            after = {"source_key": row.source_key, "date": str(operation.date), "platform": operation.platform, "clip_url": operation.clip_url}
+            audits.append(("performance.updated", "performance", row.source_key, {"before": before, "after": after}, None))
+            results.append({"index": index, "op": operation.op, "performance_id": row.performance_id, "version": version})
+        else:
+            row = existing_performance(index, operation.performance_id)
+            song_key = song_keys[row.song_id]
+            version = advance(index, song_key, operation.version)
+            deleted_performances.add(row.performance_id)
+            _ = performance_values.pop(row.performance_id, None)
+            touched_songs.add(song_key)
+            details = {"before": {"song_id": row.song_id, "source_key": row.source_key}}
+            audits.append(("performance.deleted", "performance", row.source_key, details, None))
+            results.append({"index": index, "op": operation.op, "performance_id": row.performance_id, "version": version})
+
+    artist_songs: dict[int, list[str]] = {}
+    for song in songs.values():
+        values = song_values.get(song.source_key, {})
+        if values.keys() & {"artist", "artists"}:
+            artist_songs[song.song_id] = song_artist_names(values.get("artist", song.artist), values.get("artists", song.artists))
+
+    try:
+        if new_songs:
+            for row in new_songs:
+                row["version"] = versions[row["source_key"]]
+            _ = await session.execute(insert(Song), new_songs)
+            for song_id, song_key in await session.execute(
+                select(Song.song_id, Song.source_key).where(Song.source_key.in_([row["source_key"] for row in new_songs]))
+            ):
+                song_keys[song_id] = song_key
+        song_id_by_key = {song_key: song_id for song_id, song_key in song_keys.items()}
+
+        updated_keys = {song_key for song_key in song_values} | {
+            song.source_key for song in songs.values() if versions[song.source_key] != song.version
+        }
+        if updated_keys:
+            _ = await session.execute(
+                update(Song),
+                [
+                    {"song_id": song_id_by_key[song_key], **song_values.get(song_key, {}), "version": versions[song_key]}
+                    for song_key in sorted(updated_keys)
+                ],
+            )
+        artist_songs.update(
+            (song_id_by_key[row["source_key"]], song_artist_names(row["artist"], row["artists"])) for row in new_songs
+        )
+        await replace_song_artists(session, artist_songs)
+        if new_performances:
+            _ = await session.execute(
+                insert(SongPerformance),
+                [
+                    {key: value for key, value in row.items() if key != "song_key"} | {"song_id": song_id_by_key[row["song_key"]]}
+                    for row in new_performances
+                ],
+            )
+        if performance_values:
+            _ = await session.execute(
+                update(SongPerformance),
+                [{"performance_id": performance_id, **values} for performance_id, values in performance_values.items()],
+            )
+        if deleted_performances:
+            _ = await session.execute(
+                delete(SongPerformance).where(SongPerformance.performance_id.in_(deleted_performances))
+            )
+    except IntegrityError as exc:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail="Duplicate source_key") from exc
+
+    created_performance_ids: dict[str, int] = {}
+    if new_performances:
+        created_performance_ids = {
+            source_key: performance_id
+            for performance_id, source_key in await session.execute(
+                select(SongPerformance.performance_id, SongPerformance.source_key).where(
+                    SongPerformance.source_key.in_([row["source_key"] for row in new_performances])
+                )
+            )
+        }
+    audit_rows: list[dict[str, object]] = []
+    for action, entity_type, entity_id, details, song_key in audits:
+        if song_key is not None:
+            details = {"after": {"song_id": song_id_by_key[song_key], **details["after"]}}
+        audit_rows.append(
+            {
+                "actor": principal.subject,
+                "action": action,
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "details": details,
+                "revision": pending_revision(session),
+            }
+        )
+    _ = await session.execute(insert(MusicAuditEvent), audit_rows)
+    await refresh_song_aggregates(session, [song_id_by_key[song_key] for song_key in touched_songs])
+
+    for result in results:
+        if "song_key" in result:
+            result["song_id"] = song_id_by_key[result.pop("song_key")]
+            result["performance_id"] = created_performance_ids[result["source_key"]]
+        elif result["op"] == "song.create":
+            result["song_id"] = song_id_by_key[result["source_key"]]
+    await session.commit()
+    return {"code": 0, "revision": await publish_revision(session), "results": results}
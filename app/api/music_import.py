@@ -1,16 +1,17 @@
-from collections import Counter, defaultdict
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
-from fastapi.responses import StreamingResponse
-from sqlalchemy import select, update
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import FileResponse
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db_session
+from app.api.music import _not_modified
+from app.db.session import async_session_factory, get_db_session
 from app.deps.auth import Principal, require_music_manage
-from app.models.music import MusicAuditEvent, MusicCatalogRevision, Song, SongPerformance
-from app.services.music_identifiers import derive_stream_id, generate_music_source_key
-from app.services.music_workbook import WorkbookIssue, build_performance_template, parse_performance_workbook
+from app.services.music_import_jobs import jobs as import_jobs
+from app.services.music_revision import etag_matches, revision_etag, tracker
+from app.services.music_template import templates
+from app.services.music_workbook import WorkbookIssue
 
 
 router = APIRouter(prefix="/music-manage/performances")
@@ -22,91 +23,58 @@ WorkbookUploadDep = Annotated[UploadFile, File()]
 
 @router.get("/template")
 async def performance_template(
+    request: Request,
     _: MusicPrincipalDep,
-    session: DatabaseSessionDep,
-) -> StreamingResponse:
-    songs = list((await session.scalars(select(Song).order_by(Song.title, Song.song_id))).all())
-    workbook = build_performance_template(songs)
-    return StreamingResponse(
-        workbook,
+) -> Response:
+    if (not_modified := await _not_modified(request)) is not None:
+        return not_modified
+    revision = await tracker.cached()
+    if revision is None:
+        async with async_session_factory() as session:
+            revision = await tracker.resolve(session)
+    revision, path = await templates.get(revision)
+    etag = revision_etag(revision)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return FileResponse(
+        path,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": 'attachment; filename="harei-performance-import-template.xlsx"'},
+        filename="harei-performance-import-template.xlsx",
+        headers={"ETag": etag},
     )
 
 
-@router.post("/import", status_code=status.HTTP_201_CREATED)
+@router.post("/import", status_code=status.HTTP_202_ACCEPTED)
 async def import_performances(
     file: WorkbookUploadDep,
     principal: MusicPrincipalDep,
     session: DatabaseSessionDep,
-) -> dict[str, int]:
+    response: Response,
+    mode: Annotated[str, Query(pattern="^(insert|upsert)$")] = "insert",
+    dry_run: bool = False,
+) -> dict[str, object]:
     if not (file.filename or "").lower().endswith(".xlsx"):
         raise _validation_error([WorkbookIssue(1, "file", "INVALID_EXTENSION", "只支持 .xlsx 文件")])
     contents = await file.read(MAX_IMPORT_BYTES + 1)
     if len(contents) > MAX_IMPORT_BYTES:
         raise HTTPException(status_code=413, detail={"error": "file_too_large", "max_bytes": MAX_IMPORT_BYTES})
-    rows, issues = parse_performance_workbook(contents)
-    if issues:
-        raise _validation_error(issues)
-
-    titles = {row.song_title for row in rows}
-    songs = list((await session.scalars(select(Song).where(Song.title.in_(titles)))).all())
-    matches: dict[str, list[Song]] = defaultdict(list)
-    for song in songs:
-        matches[song.title].append(song)
-    for row in rows:
-        candidates = matches.get(row.song_title, [])
-        if not candidates:
-            issues.append(WorkbookIssue(row.excel_row, "歌名", "SONG_NOT_FOUND", "数据库中不存在完全同名歌曲"))
-        elif len(candidates) > 1:
-            issues.append(WorkbookIssue(row.excel_row, "歌名", "AMBIGUOUS_SONG_TITLE", "数据库中存在多首完全同名歌曲"))
-    if issues:
-        raise _validation_error(issues)
+    if dry_run:
+        job = await import_jobs.preview(session, principal.subject, contents, mode)
+        response.status_code = status.HTTP_200_OK
+    else:
+        job = await import_jobs.submit(principal.subject, contents, mode)
+    return {"code": 0, **job.as_dict()}
 
-    song_counts: Counter[int] = Counter()
-    for row in rows:
-        song = matches[row.song_title][0]
-        source_key = generate_music_source_key("performance")
-        performance = SongPerformance(
-            source_key=source_key,
-            song_id=song.song_id,
-            performed_on=row.performed_on,
-            platform="哔哩哔哩",
-            stream_id=derive_stream_id(None, row.clip_url),
-            stream_title=row.stream_title,
-            stream_url=None,
-            clip_url=row.clip_url,
-        )
-        session.add(performance)
-        session.add(
-            MusicAuditEvent(
-                actor=principal.subject,
-                action="performance.imported",
-                entity_type="performance",
-                entity_id=source_key,
-                details={"after": {"song_id": song.song_id, "date": str(row.performed_on), "platform": "哔哩哔哩"}},
-            )
-        )
-        song_counts[song.song_id] += 1
 
-    for song_id, count in song_counts.items():
-        _ = await session.execute(update(Song).where(Song.song_id == song_id).values(version=Song.version + count))
-    _ = await session.execute(
-        update(MusicCatalogRevision)
-        .where(MusicCatalogRevision.id == 1)
-        .values(revision=MusicCatalogRevision.revision + 1)
-    )
-    await session.flush()
-    revision = await session.scalar(
-        select(MusicCatalogRevision.revision).where(MusicCatalogRevision.id == 1)
-    ) or 0
-    await session.commit()
-    return {
-        "code": 0,
-        "imported_count": len(rows),
-        "affected_song_count": len(song_counts),
-        "revision": revision,
-    }
+@router.get("/import/{job_id}")
+async def import_status(job_id: str, _: MusicPrincipalDep) -> dict[str, object]:
+    try:
+        job = await import_jobs.get(job_id)
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Import status unavailable") from None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return {"code": 0, **job}
 
 
 def _validation_error(issues: list[WorkbookIssue]) -> HTTPException:
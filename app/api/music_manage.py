@@ -9,19 +9,23 @@ from app.core.config import get_settings
 from app.core.redis import get_redis_client
 from app.db.session import get_db_session
 from app.deps.auth import Principal, require_music_manage
-from app.models.music import MusicAuditEvent, MusicCatalogRevision, Song, SongPerformance
+from app.models.music import MusicAuditEvent, Song, SongPerformance
 from app.schemas.auth import LoginRequest, LoginResponse, UserInfo
 from app.schemas.music import AuditOut, PerformanceInput, SongInput, SongUpdate, VersionInput
 from app.services.auth_service import AuthService
+from app.services.music_artists import replace_song_artists, song_artist_names
+from app.services.music_facets import summaries
 from app.services.music_identifiers import generate_music_source_key
+from app.services.music_revision import pending_revision, publish_revision
+from app.services.music_titles import normalize_title, title_key_values
 
 router = APIRouter(prefix="/music-manage")
 
-async def _changed(session: AsyncSession, actor: str, action: str, entity_type: str, entity_id: str, details: dict[str, object]) -> int:
-    await session.execute(update(MusicCatalogRevision).where(MusicCatalogRevision.id == 1).values(revision=MusicCatalogRevision.revision + 1))
-    session.add(MusicAuditEvent(actor=actor, action=action, entity_type=entity_type, entity_id=entity_id, details=details))
-    await session.flush()
-    return await session.scalar(select(MusicCatalogRevision.revision).where(MusicCatalogRevision.id == 1)) or 0
+async def _changed(session: AsyncSession, actor: str, action: str, entity_type: str, entity_id: str, details: dict[str, object]) -> None:
+    session.add(MusicAuditEvent(actor=actor, action=action, entity_type=entity_type, entity_id=entity_id, details=details, revision=pending_revision(session))); await session.flush()
+
+async def _commit(session: AsyncSession) -> int:
+    await session.commit(); return await publish_revision(session)
 
 async def _song_or_404(session: AsyncSession, song_id: int) -> Song:
     song = await session.get(Song, song_id)
@@ -36,12 +40,9 @@ async def login(payload: LoginRequest, redis: Redis = Depends(get_redis_client))
     return LoginResponse(token=token, user=UserInfo(username=payload.username), scopes=principal.scopes, expires_at=principal.expires_at)
 
 @router.get("/stats")
-async def stats(_: Principal = Depends(require_music_manage), session: AsyncSession = Depends(get_db_session)) -> dict[str, object]:
-    active = await session.scalar(select(func.count()).select_from(Song).where(Song.status == "active")) or 0
-    archived = await session.scalar(select(func.count()).select_from(Song).where(Song.status == "archived")) or 0
-    performances = await session.scalar(select(func.count()).select_from(SongPerformance)) or 0
-    revision = await session.scalar(select(MusicCatalogRevision.revision).where(MusicCatalogRevision.id == 1)) or 0
-    return {"code": 0, "activeSongs": active, "archivedSongs": archived, "performanceCount": performances, "revision": revision}
+async def stats(_: Principal = Depends(require_music_manage), session: AsyncSession = Depends(get_db_session), redis: Redis = Depends(get_redis_client)) -> dict[str, object]:
+    summary = await summaries.get(session, redis)
+    return {"code": 0, "activeSongs": summary.active_songs, "archivedSongs": summary.archived_songs, "performanceCount": summary.performances, "facetCounts": summary.facet_counts, "revision": summary.revision}
 
 @router.get("/songs")
 async def songs(q: str | None = None, status: str | None = None, page: int = Query(1, ge=1), page_size: int = Query(30, ge=1, le=100), _: Principal = Depends(require_music_manage), session: AsyncSession = Depends(get_db_session)) -> dict[str, object]:
@@ -54,13 +55,14 @@ async def songs(q: str | None = None, status: str | None = None, page: int = Que
 
 @router.post("/songs", status_code=201)
 async def create_song(payload: SongInput, principal: Principal = Depends(require_music_manage), session: AsyncSession = Depends(get_db_session)) -> dict[str, object]:
-    song = Song(source_key=generate_music_source_key("song"), **payload.model_dump())
+    song = Song(source_key=generate_music_source_key("song"), title_key=normalize_title(payload.title), **payload.model_dump())
     session.add(song)
     try: await session.flush()
     except IntegrityError as exc:
         await session.rollback(); raise HTTPException(status_code=409, detail="Duplicate source_key") from exc
-    revision = await _changed(session, principal.subject, "song.created", "song", song.source_key, {})
-    await session.commit()
+    await replace_song_artists(session, {song.song_id: song_artist_names(song.artist, song.artists)})
+    await _changed(session, principal.subject, "song.created", "song", song.source_key, {})
+    revision = await _commit(session)
     return {"code": 0, "song_id": song.song_id, "source_key": song.source_key, "version": song.version, "revision": revision}
 
 @router.get("/songs/{song_id}")
@@ -72,12 +74,13 @@ async def song_detail(song_id: int, _: Principal = Depends(require_music_manage)
 @router.put("/songs/{song_id}")
 async def update_song(song_id: int, payload: SongUpdate, principal: Principal = Depends(require_music_manage), session: AsyncSession = Depends(get_db_session)) -> dict[str, object]:
     values = payload.model_dump(exclude_unset=True, exclude={"version"})
-    result = await session.execute(update(Song).where(Song.song_id == song_id, Song.version == payload.version).values(**values, version=Song.version + 1))
+    result = await session.execute(update(Song).where(Song.song_id == song_id, Song.version == payload.version).values(**values, **title_key_values(values), version=Song.version + 1))
     if not result.rowcount:
         await _song_or_404(session, song_id); raise HTTPException(status_code=409, detail="Version conflict")
     song = await _song_or_404(session, song_id)
-    revision = await _changed(session, principal.subject, "song.updated", "song", song.source_key, {"changed": values})
-    await session.commit(); await session.refresh(song)
+    if values.keys() & {"artist", "artists"}: await replace_song_artists(session, {song.song_id: song_artist_names(song.artist, song.artists)})
+    await _changed(session, principal.subject, "song.updated", "song", song.source_key, {"changed": values})
+    revision = await _commit(session); await session.refresh(song)
     return {"code": 0, "version": song.version, "revision": revision}
 
 async def _set_status(song_id: int, payload: VersionInput, desired: str, action: str, principal: Principal, session: AsyncSession) -> dict[str, object]:
@@ -85,8 +88,8 @@ async def _set_status(song_id: int, payload: VersionInput, desired: str, action:
     result = await session.execute(update(Song).where(Song.song_id == song_id, Song.version == payload.version).values(status=desired, version=Song.version + 1))
     if not result.rowcount:
         await _song_or_404(session, song_id); raise HTTPException(status_code=409, detail="Version conflict")
-    song = await _song_or_404(session, song_id); revision = await _changed(session, principal.subject, action, "song", song.source_key, {"before": before_status, "after": desired})
-    await session.commit(); return {"code": 0, "revision": revision}
+    song = await _song_or_404(session, song_id); await _changed(session, principal.subject, action, "song", song.source_key, {"before": before_status, "after": desired})
+    return {"code": 0, "revision": await _commit(session)}
 
 @router.post("/songs/{song_id}/archive")
 async def archive(song_id: int, payload: VersionInput, principal: Principal = Depends(require_music_manage), session: AsyncSession = Depends(get_db_session)) -> dict[str, object]: return await _set_status(song_id, payload, "archived", "song.archived", principal, session)
@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, select, update
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.music_manage import _changed, _song_or_404
-from app.db.session import get_db_session
+from app.api.music import _not_modified
+from app.api.music_manage import _changed, _commit, _song_or_404
+from app.db.session import async_session_factory, get_db_session
 from app.deps.auth import Principal, require_music_manage
-from app.models.music import MusicAuditEvent, Song, SongPerformance
+from app.models.music import MusicAuditArchive, MusicAuditEvent, Song, SongPerformance
 from app.schemas.music import AuditOut, PerformanceInput
+from app.services.music_aggregates import refresh_song_aggregates
+from app.services.music_audit import AuditFilters, approximate_total, list_audit_events
 from app.services.music_identifiers import derive_stream_id, generate_music_source_key
+from app.services.music_revision import etag_matches, read_revision, revision_etag
+from app.services.music_tables import TABLE_FORMATS, parquet_available, table_chunks, table_filename
 
 router = APIRouter(prefix="/music-manage")
 
@@ -32,8 +40,9 @@ async def create_performance(song_id: int, payload: PerformanceInput, principal:
     try: await session.flush()
     except IntegrityError as exc:
         await session.rollback(); raise HTTPException(status_code=409, detail="Duplicate source_key") from exc
-    revision = await _changed(session, principal.subject, "performance.created", "performance", row.source_key, {"after": {"song_id": song_id, "date": str(row.performed_on), "platform": row.platform}})
-    await session.commit()
+    await refresh_song_aggregates(session, [song_id])
+    await _changed(session, principal.subject, "performance.created", "performance", row.source_key, {"after": {"song_id": song_id, "date": str(row.performed_on), "platform": row.platform}})
+    revision = await _commit(session)
     return {"code": 0, "performance_id": row.performance_id, "source_key": row.source_key, "version": version, "revision": revision}
 
 @router.put("/performances/{performance_id}")
@@ -48,8 +57,9 @@ async def update_performance(performance_id: int, payload: PerformanceInput, pri
         await session.flush()
     except IntegrityError as exc:
         await session.rollback(); raise HTTPException(status_code=409, detail="Duplicate source_key") from exc
-    revision = await _changed(session, principal.subject, "performance.updated", "performance", row.source_key, {"before": before, "after": {"source_key": row.source_key, "date": str(row.performed_on), "platform": row.platform, "clip_url": row.clip_url}})
-    await session.commit(); return {"code": 0, "version": version, "revision": revision}
+    await refresh_song_aggregates(session, [row.song_id])
+    await _changed(session, principal.subject, "performance.updated", "performance", row.source_key, {"before": before, "after": {"source_key": row.source_key, "date": str(row.performed_on), "platform": row.platform, "clip_url": row.clip_url}})
+    return {"code": 0, "version": version, "revision": await _commit(session)}
 
 @router.delete("/performances/{performance_id}")
 async def delete_performance(performance_id: int, version: int = Query(ge=1), principal: Principal = Depends(require_music_manage), session: AsyncSession = Depends(get_db_session)) -> dict[str, object]:
@@ -58,11 +68,33 @@ async def delete_performance(performance_id: int, version: int = Query(ge=1), pr
     source_key, song_id = row.source_key, row.song_id
     next_version = await _bump_song_version(session, song_id, version)
     await session.delete(row)
-    revision = await _changed(session, principal.subject, "performance.deleted", "performance", source_key, {"before": {"song_id": song_id, "source_key": source_key}})
-    await session.commit(); return {"code": 0, "version": next_version, "revision": revision}
+    await session.flush()
+    await refresh_song_aggregates(session, [song_id])
+    await _changed(session, principal.subject, "performance.deleted", "performance", source_key, {"before": {"song_id": song_id, "source_key": source_key}})
+    return {"code": 0, "version": next_version, "revision": await _commit(session)}
 
 @router.get("/audit")
-async def audit(page: int = Query(1, ge=1), page_size: int = Query(50, ge=1, le=100), _: Principal = Depends(require_music_manage), session: AsyncSession = Depends(get_db_session)) -> dict[str, object]:
-    total = await session.scalar(select(func.count()).select_from(MusicAuditEvent)) or 0
-    rows = list((await session.scalars(select(MusicAuditEvent).order_by(MusicAuditEvent.audit_id.desc()).offset((page - 1) * page_size).limit(page_size))).all())
-    return {"code": 0, "items": [AuditOut.model_validate(row, from_attributes=True).model_dump() for row in rows], "total": total, "page": page, "page_size": page_size}
+async def audit(before: int | None = Query(None, ge=1), page_size: int = Query(50, ge=1, le=100), actor: str | None = None, action: str | None = None, entity_type: str | None = None, entity_id: str | None = None, archived: bool = False, _: Principal = Depends(require_music_manage), session: AsyncSession = Depends(get_db_session)) -> dict[str, object]:
+    model, filters = MusicAuditArchive if archived else MusicAuditEvent, AuditFilters(actor=actor, action=action, entity_type=entity_type, entity_id=entity_id)
+    rows, next_before = await list_audit_events(session, model, filters, before, page_size)
+    total, total_exact = await approximate_total(session, model, filters)
+    return {"code": 0, "items": [AuditOut.model_validate(row, from_attributes=True).model_dump() for row in rows], "total": total, "total_exact": total_exact, "page_size": page_size, "next_before": next_before}
+
+async def _stream_table(session: AsyncSession, table: str, fmt: str) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in table_chunks(session, table, fmt): yield chunk
+    finally: await session.close()
+
+@router.get("/export")
+async def export_table(request: Request, table: str = Query(pattern="^(songs|performances)$"), fmt: str = Query("csv", alias="format", pattern="^(csv|parquet)$"), _: Principal = Depends(require_music_manage)) -> Response:
+    if fmt == "parquet" and not parquet_available(): raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+    if (not_modified := await _not_modified(request)) is not None: return not_modified
+    session = async_session_factory()
+    try: revision = await read_revision(session)
+    except BaseException:
+        await session.close(); raise
+    etag = revision_etag(revision)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        await session.close(); return Response(status_code=304, headers={"ETag": etag})
+    headers = {"ETag": etag, "Content-Disposition": f'attachment; filename="{table_filename(table, revision, fmt)}"'}
+    return StreamingResponse(_stream_table(session, table, fmt), media_type=TABLE_FORMATS[fmt], headers=headers)
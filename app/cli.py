@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from PIL import UnidentifiedImageError
+from sqlalchemy import func, select
+
+from app.api.box import render_gif_previews
+from app.core.config import get_settings
+from app.db.session import async_session_factory, engine
+from app.models.image import Image
+from app.models.message_archive import ImageArchive
+from app.services.message_archive import archive_messages
+from app.services.music_aggregates import rebuild_song_aggregates
+from app.services.music_artists import ARTIST_BATCH_SIZE, backfill_song_artists
+from app.services.music_audit import archive_audit_events
+from app.services.music_rollup import ROLLUP_BATCH_SIZE, rebuild_monthly_rollup
+from app.services.music_stream_backfill import STREAM_BACKFILL_BATCH_SIZE, backfill_stream_id_batch
+from app.services.music_titles import TITLE_KEY_BATCH_SIZE, refresh_title_keys
+
+
+CommandHandler = Callable[[argparse.Namespace], Awaitable[None]]
+
+
+async def _archive_messages(args: argparse.Namespace) -> None:
+    async with async_session_factory() as session:
+        moved = await archive_messages(session, args.days, args.batch_size)
+    print(f"已归档 {moved} 条留言")
+
+
+async def _backfill_gif_previews(args: argparse.Namespace) -> None:
+    updated = failed = 0
+    async with async_session_factory() as session:
+        for model in (Image, ImageArchive):
+            last_image_id = 0
+            while True:
+                rows = list(
+                    (
+                        await session.scalars(
+                            select(model)
+                            .where(
+                                model.image_id > last_image_id,
+                                func.lower(model.image_path).like("%.gif"),
+                                model.thumb_path == model.image_path,
+                            )
+                            .order_by(model.image_id)
+                            .limit(args.batch_size)
+                        )
+                    ).all()
+                )
+                if not rows:
+                    break
+                for row in rows:
+                    original_path = Path(row.image_path)
+                    filename_base = original_path.stem.removesuffix("-original")
+                    generated_paths: list[Path] = []
+                    try:
+                        thumb_path, preview_path, phash = await asyncio.to_thread(
+                            render_gif_previews, original_path, filename_base, generated_paths
+                        )
+                    except (UnidentifiedImageError, OSError):
+                        for path in generated_paths:
+                            path.unlink(missing_ok=True)
+                        failed += 1
+                        continue
+                    row.thumb_path, row.jpg_path = str(thumb_path), str(preview_path)
+                    if row.phash is None:
+                        row.phash = phash
+                    updated += 1
+                last_image_id = rows[-1].image_id
+                await session.commit()
+    print(f"已生成 {updated} 张 GIF 预览，失败 {failed} 张")
+
+
+async def _archive_music_audit(args: argparse.Namespace) -> None:
+    async with async_session_factory() as session:
+        moved = await archive_audit_events(session, args.days, args.batch_size)
+    print(f"已归档 {moved} 条曲库审计记录")
+
+
+async def _refresh_song_aggregates(_: argparse.Namespace) -> None:
+    async with async_session_factory() as session:
+        count = await rebuild_song_aggregates(session)
+    print(f"已重算 {count} 首歌曲的演唱统计")
+
+
+async def _backfill_stream_ids(args: argparse.Namespace) -> None:
+    scanned_until, updated = args.after_id, 0
+    async with async_session_factory() as session:
+        while True:
+            last_id, count = await backfill_stream_id_batch(session, scanned_until, args.batch_size)
+            if last_id is None:
+                break
+            scanned_until, updated = last_id, updated + count
+            print(f"已处理至 performance_id={scanned_until}，累计补齐 {updated} 条")
+    print(f"已补齐 {updated} 条演唱记录的 stream_id")
+
+
+async def _backfill_song_artists(args: argparse.Namespace) -> None:
+    async with async_session_factory() as session:
+        processed = await backfill_song_artists(session, args.batch_size)
+    print(f"已重建 {processed} 首歌曲的歌手关联")
+
+
+async def _refresh_title_keys(args: argparse.Namespace) -> None:
+    async with async_session_factory() as session:
+        updated = await refresh_title_keys(session, args.batch_size)
+    print(f"已更新 {updated} 首歌曲的标题匹配键")
+
+
+async def _rebuild_performance_rollup(args: argparse.Namespace) -> None:
+    async with async_session_factory() as session:
+        count = await rebuild_monthly_rollup(session, args.batch_size)
+    print(f"已重建 {count} 首歌曲的按月演唱汇总")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    archive = commands.add_parser("archive-messages", help="将过期的已归档/已删除留言迁移至月分区归档表")
+    archive.add_argument("--days", type=int, default=settings.box_archive_after_days)
+    archive.add_argument("--batch-size", type=int, default=settings.box_archive_batch_size)
+    archive.set_defaults(handler=_archive_messages)
+
+    gif = commands.add_parser("backfill-gif-previews", help="为历史 GIF 图片（含已归档图片）生成首帧缩略图与动图预览")
+    gif.add_argument("--batch-size", type=int, default=200)
+    gif.set_defaults(handler=_backfill_gif_previews)
+
+    audit = commands.add_parser("archive-music-audit", help="将过期的曲库审计记录迁移至月分区归档表")
+    audit.add_argument("--days", type=int, default=settings.music_audit_archive_after_days)
+    audit.add_argument("--batch-size", type=int, default=settings.music_audit_archive_batch_size)
+    audit.set_defaults(handler=_archive_music_audit)
+
+    aggregates = commands.add_parser("refresh-song-aggregates", help="重算全部歌曲的演唱次数与最近演唱记录")
+    aggregates.set_defaults(handler=_refresh_song_aggregates)
+
+    streams = commands.add_parser("backfill-stream-ids", help="为历史演唱记录分批补齐 stream_id，可通过 --after-id 断点续跑")
+    streams.add_argument("--after-id", type=int, default=0)
+    streams.add_argument("--batch-size", type=int, default=STREAM_BACKFILL_BATCH_SIZE)
+    streams.set_defaults(handler=_backfill_stream_ids)
+
+    artists = commands.add_parser("backfill-song-artists", help="根据 songs.artists 分批重建 song_artists 歌手关联表")
+    artists.add_argument("--batch-size", type=int, default=ARTIST_BATCH_SIZE)
+    artists.set_defaults(handler=_backfill_song_artists)
+
+    titles = commands.add_parser("refresh-title-keys", help="重算全部歌曲的标题匹配键（NFKC、忽略大小写、空白与标点）")
+    titles.add_argument("--batch-size", type=int, default=TITLE_KEY_BATCH_SIZE)
+    titles.set_defaults(handler=_refresh_title_keys)
+
+    rollup = commands.add_parser("rebuild-performance-rollup", help="从演唱记录全量重建按月演唱汇总表")
+    rollup.add_argument("--batch-size", type=int, default=ROLLUP_BATCH_SIZE)
+    rollup.set_defaults(handler=_rebuild_performance_rollup)
+    return parser
+
+
+async def _run(handler: CommandHandler, args: argparse.Namespace) -> None:
+    try:
+        await handler(args)
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    asyncio.run(_run(args.handler, args))
+
+
+if __name__ == "__main__":
+    main()
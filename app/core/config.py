@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -41,11 +42,21 @@ class Settings(BaseSettings):
 
     token_ttl_seconds: int = 60 * 60 * 24 * 7
 
+    # -------------------------
+    # 留言箱图片查重（flag 标记 / reject 拒收）
+    # -------------------------
+    box_duplicate_image_action: Literal["flag", "reject"] = "flag"
+    box_duplicate_hash_distance: int = 6
+    box_archive_after_days: int = 180
+    box_archive_batch_size: int = 500
+
     auth_username: str
     auth_password_hash: str
     music_auth_username: str = ""
     music_auth_password_hash: str = ""
     music_token_ttl_seconds: int | None = None
+    music_audit_archive_after_days: int = 180
+    music_audit_archive_batch_size: int = 1000
 
     cors_allow_origins: str = "https://harei.cn,https://api.harei.cn"
     trusted_proxy_hosts: str = "127.0.0.1,::1"
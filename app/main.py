@@ -1,7 +1,7 @@
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
-from app.services import bili_captain_listener
+from app.services import bili_captain_listener, box_feed, music_import_jobs, music_revision, music_template
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import JSONResponse
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
@@ -13,10 +13,12 @@ from app.api.captains import router as captains_router
 from app.api.download import router as download_router
 from app.api.live import router as live_router
 from app.api.huangdou import router as huangdou_router
-from app.api.music import router as music_router
+from app.api.music_analytics import router as music_analytics_router
+from app.api.music import export_artifacts as music_export_artifacts, router as music_router
 from app.api.music_manage import router as music_manage_router
 from app.api.music_manage_extra import router as music_manage_extra_router
 from app.api.music_import import router as music_import_router
+from app.api.music_batch import router as music_batch_router
 from app.api.tag import router as tag_router
 from app.core.config import get_settings
 from app.core.redis import close_redis_client
@@ -97,6 +99,11 @@ async def lifespan(_: FastAPI):
         yield
     finally:
         await bili_captain_listener.shutdown()
+        await box_feed.broker.close()
+        await music_revision.tracker.close()
+        await music_export_artifacts.close()
+        await music_import_jobs.jobs.close()
+        await music_template.templates.close()
         await close_redis_client()
         await engine.dispose()
 
@@ -119,8 +126,10 @@ app.include_router(live_router)
 app.include_router(download_router)
 
 app.include_router(huangdou_router)
+app.include_router(music_analytics_router)
 app.include_router(music_router)
 app.include_router(music_manage_router)
 app.include_router(music_manage_extra_router)
 app.include_router(music_import_router)
+app.include_router(music_batch_router)
 app.include_router(tag_router)
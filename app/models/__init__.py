@@ -4,7 +4,8 @@ from app.models.gift_ranking import GiftRanking
 from app.models.download import Download
 from app.models.image import Image
 from app.models.message import Message
-from app.models.music import MusicAuditEvent, MusicCatalogRevision, Song, SongPerformance
+from app.models.message_archive import ImageArchive, MessageArchive
+from app.models.music import MusicAuditArchive, MusicAuditEvent, MusicCatalogRevision, Song, SongArtist, SongPerformance, SongPerformanceMonthly
 from app.models.tag import Tag
 
 __all__ = [
@@ -13,10 +14,15 @@ __all__ = [
     "Download",
     "GiftRanking",
     "Image",
+    "ImageArchive",
     "Message",
+    "MessageArchive",
+    "MusicAuditArchive",
     "MusicAuditEvent",
     "MusicCatalogRevision",
     "Song",
+    "SongArtist",
     "SongPerformance",
+    "SongPerformanceMonthly",
     "Tag",
 ]
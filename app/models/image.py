@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, Index, String, TIMESTAMP
+from sqlalchemy import BigInteger, ForeignKey, Index, String, TIMESTAMP
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -15,6 +16,8 @@ class Image(Base):
     image_path: Mapped[str] = mapped_column(String(255), nullable=False)
     thumb_path: Mapped[str | None] = mapped_column(String(255))
     jpg_path: Mapped[str | None] = mapped_column(String(255))
+    phash: Mapped[int | None] = mapped_column(BigInteger().with_variant(mysql.BIGINT(unsigned=True), "mysql"))
+    duplicate_of: Mapped[int | None] = mapped_column()
     uploaded_at: Mapped[datetime] = mapped_column(
         TIMESTAMP,
         nullable=False,
@@ -23,4 +26,7 @@ class Image(Base):
 
     message = relationship("Message", back_populates="images")
 
-    __table_args__ = (Index("idx_images_message_id", "message_id"),)
+    __table_args__ = (
+        Index("idx_images_message_id", "message_id"),
+        Index("idx_images_phash", "phash"),
+    )
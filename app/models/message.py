@@ -30,5 +30,12 @@ class Message(Base):
     __table_args__ = (
         Index("idx_messages_ip_created", "ip_address", "created_at"),
         Index("idx_messages_status_created", "status", "created_at"),
+        Index("idx_messages_created", "created_at", "message_id"),
         Index("idx_messages_tag", "tag"),
+        Index(
+            "ftx_messages_text",
+            "message_text",
+            mysql_prefix="FULLTEXT",
+            mysql_with_parser="ngram",
+        ),
     )
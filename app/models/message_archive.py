@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Enum, Index, Integer, String, Text, TIMESTAMP
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class MessageArchive(Base):
+    __tablename__ = "messages_archive"
+
+    message_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    archive_month: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    ip_address: Mapped[str] = mapped_column(String(45), nullable=False)
+    message_text: Mapped[str | None] = mapped_column(Text)
+    tag: Mapped[str | None] = mapped_column(String(255))
+    status: Mapped[str] = mapped_column(
+        Enum("pending", "approved", "archived", "delete", name="messages_archive_status"),
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP,
+        nullable=False,
+        server_default=func.current_timestamp(),
+    )
+
+    __table_args__ = (
+        Index("idx_messages_archive_status_created", "status", "created_at"),
+        Index("idx_messages_archive_created", "created_at", "message_id"),
+        Index("idx_messages_archive_tag", "tag"),
+    )
+
+
+class ImageArchive(Base):
+    __tablename__ = "images_archive"
+
+    image_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    archive_month: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    message_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    image_path: Mapped[str] = mapped_column(String(255), nullable=False)
+    thumb_path: Mapped[str | None] = mapped_column(String(255))
+    jpg_path: Mapped[str | None] = mapped_column(String(255))
+    phash: Mapped[int | None] = mapped_column(BigInteger().with_variant(mysql.BIGINT(unsigned=True), "mysql"))
+    duplicate_of: Mapped[int | None] = mapped_column()
+    uploaded_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False)
+
+    __table_args__ = (
+        Index("idx_images_archive_message_id", "message_id"),
+        Index("idx_images_archive_phash", "phash"),
+    )
@@ -1,6 +1,6 @@
 from datetime import date, datetime
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, JSON, String, Text, func
+from sqlalchemy import Date, DateTime, ForeignKey, Index, Integer, JSON, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -11,6 +11,7 @@ class Song(Base):
     song_id: Mapped[int] = mapped_column(primary_key=True)
     source_key: Mapped[str] = mapped_column(String(80), unique=True, index=True)
     title: Mapped[str] = mapped_column(String(255), index=True)
+    title_key: Mapped[str] = mapped_column(String(255), default="", server_default="")
     artist: Mapped[str] = mapped_column(String(500))
     artists: Mapped[list[str]] = mapped_column(JSON)
     genre: Mapped[str] = mapped_column(String(100), index=True)
@@ -20,9 +21,27 @@ class Song(Base):
     metadata_status: Mapped[str] = mapped_column(String(30), default="complete")
     status: Mapped[str] = mapped_column(String(20), default="active", index=True)
     version: Mapped[int] = mapped_column(Integer, default=1)
+    performance_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    latest_performance_id: Mapped[int | None] = mapped_column(Integer)
+    latest_performed_on: Mapped[date | None] = mapped_column(Date)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        Index("idx_songs_status_title", "status", "title"),
+        Index("idx_songs_status_latest", "status", "latest_performed_on"),
+        Index("idx_songs_status_count", "status", "performance_count"),
+        Index("idx_songs_title_key", "title_key"),
+    )
+
+
+class SongArtist(Base):
+    __tablename__ = "song_artists"
+    song_id: Mapped[int] = mapped_column(ForeignKey("songs.song_id", ondelete="CASCADE"), primary_key=True)
+    artist: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    __table_args__ = (Index("idx_song_artists_artist", "artist", "song_id"),)
+
 
 class SongPerformance(Base):
     __tablename__ = "song_performances"
@@ -38,6 +57,22 @@ class SongPerformance(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        Index("idx_performances_song_date_stream", "song_id", "performed_on", "stream_id"),
+        Index("idx_performances_stream_date", "stream_id", "performed_on"),
+    )
+
+
+class SongPerformanceMonthly(Base):
+    __tablename__ = "song_performance_monthly"
+    song_id: Mapped[int] = mapped_column(ForeignKey("songs.song_id", ondelete="CASCADE"), primary_key=True)
+    month: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    performance_count: Mapped[int] = mapped_column(Integer)
+    first_performed_on: Mapped[date] = mapped_column(Date)
+    last_performed_on: Mapped[date] = mapped_column(Date)
+
+    __table_args__ = (Index("idx_performance_monthly_month_count", "month", "performance_count"),)
+
 
 class MusicCatalogRevision(Base):
     __tablename__ = "music_catalog_revision"
@@ -50,8 +85,36 @@ class MusicAuditEvent(Base):
     __tablename__ = "music_audit_events"
     audit_id: Mapped[int] = mapped_column(primary_key=True)
     actor: Mapped[str] = mapped_column(String(255))
-    action: Mapped[str] = mapped_column(String(80), index=True)
+    action: Mapped[str] = mapped_column(String(80))
     entity_type: Mapped[str] = mapped_column(String(40))
-    entity_id: Mapped[str] = mapped_column(String(100), index=True)
+    entity_id: Mapped[str] = mapped_column(String(100))
     details: Mapped[dict[str, object]] = mapped_column(JSON, default=dict)
+    revision: Mapped[int | None] = mapped_column(Integer, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
+
+    __table_args__ = (
+        Index("idx_music_audit_revision", "revision"),
+        Index("idx_music_audit_actor", "actor", "audit_id"),
+        Index("idx_music_audit_action", "action", "audit_id"),
+        Index("idx_music_audit_entity", "entity_type", "entity_id", "audit_id"),
+    )
+
+
+class MusicAuditArchive(Base):
+    __tablename__ = "music_audit_archive"
+    audit_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    archive_month: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    actor: Mapped[str] = mapped_column(String(255))
+    action: Mapped[str] = mapped_column(String(80))
+    entity_type: Mapped[str] = mapped_column(String(40))
+    entity_id: Mapped[str] = mapped_column(String(100))
+    details: Mapped[dict[str, object]] = mapped_column(JSON, default=dict)
+    revision: Mapped[int | None] = mapped_column(Integer)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_music_audit_archive_actor", "actor", "audit_id"),
+        Index("idx_music_audit_archive_action", "action", "audit_id"),
+        Index("idx_music_audit_archive_entity", "entity_type", "entity_id", "audit_id"),
+    )
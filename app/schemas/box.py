@@ -25,6 +25,7 @@ class MessageItem(BaseModel):
     images: list[str]
     images_thumb: list[str]
     images_jpg: list[str]
+    images_duplicate_of: list[int | None] = []
 
 
 class MessageListResponse(BaseModel):
@@ -44,6 +45,33 @@ class MessageListResponse(BaseModel):
                     images=[image.image_path for image in message.images],
                     images_thumb=[image.thumb_path for image in message.images],
                     images_jpg=[image.jpg_path for image in message.images],
+                    images_duplicate_of=[image.duplicate_of for image in message.images],
                 )
             )
         return MessageListResponse(items=items)
+
+
+class MessageSearchItem(MessageItem):
+    status: str
+    highlights: list[tuple[int, int]]
+
+
+class MessageSearchResponse(BaseModel):
+    code: int = 0
+    items: list[MessageSearchItem]
+    total: int
+    page: int
+    page_size: int
+
+
+class MessageHistoryItem(MessageItem):
+    status: str
+    archived: bool
+
+
+class MessageHistoryResponse(BaseModel):
+    code: int = 0
+    items: list[MessageHistoryItem]
+    total: int
+    page_size: int
+    next_before: str | None
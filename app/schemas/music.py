@@ -1,4 +1,5 @@
 from datetime import UTC, date, datetime
+from typing import Annotated, Literal
 from urllib.parse import urlsplit
 
 from pydantic import BaseModel, Field, JsonValue, field_validator
@@ -36,6 +37,17 @@ class SongSummary(BaseModel):
 class SongDetail(SongSummary):
     performances: list[PerformanceOut]
 
+class StreamSongOut(BaseModel):
+    song_id: int
+    id: str
+    title: str
+    artist: str
+    genre: str
+    language: str
+    workType: str
+    performanceCount: int
+    performance: PerformanceOut
+
 class MusicListResponse(BaseModel):
     code: int = 0
     items: list[SongSummary]
@@ -43,6 +55,7 @@ class MusicListResponse(BaseModel):
     page: int
     page_size: int
     facets: dict[str, list[str]]
+    facet_counts: dict[str, dict[str, int]]
     stats: dict[str, int]
     revision: int
 
@@ -88,6 +101,44 @@ class PerformanceInput(BaseModel):
             raise PydanticCustomError("http_url", "URL must use http or https")
         return value
 
+class SongCreateOperation(SongInput):
+    op: Literal["song.create"]
+    ref: str | None = None
+
+class SongUpdateOperation(SongUpdate):
+    op: Literal["song.update"]
+    song_id: int
+
+class SongStatusOperation(VersionInput):
+    op: Literal["song.archive", "song.restore"]
+    song_id: int
+
+class PerformanceCreateOperation(PerformanceInput):
+    op: Literal["performance.create"]
+    song_id: int | None = None
+    song_ref: str | None = None
+
+class PerformanceUpdateOperation(PerformanceInput):
+    op: Literal["performance.update"]
+    performance_id: int
+
+class PerformanceDeleteOperation(VersionInput):
+    op: Literal["performance.delete"]
+    performance_id: int
+
+BatchOperation = Annotated[
+    SongCreateOperation
+    | SongUpdateOperation
+    | SongStatusOperation
+    | PerformanceCreateOperation
+    | PerformanceUpdateOperation
+    | PerformanceDeleteOperation,
+    Field(discriminator="op"),
+]
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(min_length=1, max_length=500)
+
 class AuditOut(BaseModel):
     audit_id: int
     actor: str
@@ -95,6 +146,7 @@ class AuditOut(BaseModel):
     entity_type: str
     entity_id: str
     details: dict[str, JsonValue]
+    revision: int | None = None
     created_at: datetime
 
     @field_validator("created_at")
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Final
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.redis import get_redis_client
+
+
+logger = logging.getLogger(__name__)
+
+FEED_STREAM_KEY: Final = "box:feed"
+FEED_CHANNEL: Final = "box:feed:live"
+FEED_STREAM_MAXLEN: Final = 1000
+SUBSCRIBER_QUEUE_SIZE: Final = 100
+LISTENER_RETRY_SECONDS: Final = 1.0
+
+
+@dataclass(frozen=True, slots=True)
+class FeedEvent:
+    id: str
+    event: str
+    data: str
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.event}\ndata: {self.data}\n\n"
+
+
+@dataclass(slots=True, eq=False)
+class FeedSubscription:
+    queue: asyncio.Queue[FeedEvent] = field(
+        default_factory=lambda: asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    )
+    overflowed: bool = False
+
+
+def stream_id_key(event_id: str) -> tuple[int, int] | None:
+    milliseconds, _, sequence = event_id.partition("-")
+    try:
+        return int(milliseconds), int(sequence or 0)
+    except ValueError:
+        return None
+
+
+class FeedBroker:
+    def __init__(self) -> None:
+        self._subscriptions: set[FeedSubscription] = set()
+        self._listener: asyncio.Task[None] | None = None
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[FeedSubscription]:
+        subscription = FeedSubscription()
+        self._subscriptions.add(subscription)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            yield subscription
+        finally:
+            self._subscriptions.discard(subscription)
+
+    async def close(self) -> None:
+        if self._listener is None:
+            return
+        _ = self._listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._listener
+        self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                redis = await get_redis_client()
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(FEED_CHANNEL)
+                    async for item in pubsub.listen():
+                        if item["type"] != "message":
+                            continue
+                        payload = json.loads(item["data"])
+                        self._dispatch(FeedEvent(id=payload["id"], event="message", data=payload["data"]))
+            except (RedisError, OSError, ValueError, KeyError):
+                logger.warning("[box-feed] 订阅中断，%.1f 秒后重连", LISTENER_RETRY_SECONDS, exc_info=True)
+                await asyncio.sleep(LISTENER_RETRY_SECONDS)
+
+    def _dispatch(self, event: FeedEvent) -> None:
+        for subscription in list(self._subscriptions):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self._subscriptions.discard(subscription)
+
+
+broker = FeedBroker()
+
+
+async def publish_message(redis: Redis, payload: dict[str, object]) -> str:
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    event_id = await redis.xadd(
+        FEED_STREAM_KEY,
+        {"data": data},
+        maxlen=FEED_STREAM_MAXLEN,
+        approximate=True,
+    )
+    _ = await redis.publish(FEED_CHANNEL, json.dumps({"id": event_id, "data": data}))
+    return event_id
+
+
+async def replay_since(redis: Redis, last_event_id: str) -> list[FeedEvent]:
+    last_key = stream_id_key(last_event_id)
+    if last_key is None:
+        return []
+    events: list[FeedEvent] = []
+    if not await redis.xrange(FEED_STREAM_KEY, min=last_event_id, max=last_event_id, count=1):
+        oldest = await redis.xrange(FEED_STREAM_KEY, count=1)
+        if oldest and (stream_id_key(oldest[0][0]) or (0, 0)) > last_key:
+            events.append(FeedEvent(id=last_event_id, event="reset", data="{}"))
+    entries = await redis.xrange(FEED_STREAM_KEY, min=f"({last_event_id}", max="+", count=FEED_STREAM_MAXLEN)
+    events.extend(FeedEvent(id=entry_id, event="message", data=fields["data"]) for entry_id, fields in entries)
+    return events
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from itertools import combinations
+from typing import Final
+
+from PIL import Image as PilImage
+from redis.asyncio import Redis
+from sqlalchemy import select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.image import Image
+from app.models.message import Message
+from app.models.message_archive import ImageArchive, MessageArchive
+
+
+HASH_BITS: Final = 64
+DELETED_HASHES_KEY: Final = "box:phash:deleted:stream"
+DELETED_HASHES_MAXLEN: Final = 10_000
+STREAM_START_ID: Final = "0-0"
+
+
+def dhash(image: PilImage.Image, hash_size: int = 8) -> int:
+    resized = image.convert("L").resize((hash_size + 1, hash_size), PilImage.Resampling.LANCZOS)
+    pixels = resized.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+class MultiIndexHash:
+    def __init__(self, max_distance: int, chunk_count: int = 4) -> None:
+        self.max_distance = max_distance
+        self._chunk_bits = HASH_BITS // chunk_count
+        self._mask = (1 << self._chunk_bits) - 1
+        self._probes = [
+            sum(1 << bit for bit in bits)
+            for radius in range(max_distance // chunk_count + 1)
+            for bits in combinations(range(self._chunk_bits), radius)
+        ]
+        self._tables: list[dict[int, list[tuple[int, int]]]] = [defaultdict(list) for _ in range(chunk_count)]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, item_id: int) -> None:
+        entry = (value, item_id)
+        for chunk, table in enumerate(self._tables):
+            table[(value >> (chunk * self._chunk_bits)) & self._mask].append(entry)
+        self._size += 1
+
+    def nearest(self, value: int, max_distance: int | None = None) -> tuple[int, int] | None:
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        best: tuple[int, int] | None = None
+        for chunk, table in enumerate(self._tables):
+            key = (value >> (chunk * self._chunk_bits)) & self._mask
+            for probe in self._probes:
+                for candidate, item_id in table.get(key ^ probe, ()):
+                    distance = (candidate ^ value).bit_count()
+                    if distance <= limit and (best is None or distance < best[1]):
+                        best = (item_id, distance)
+                        if distance == 0:
+                            return best
+        return best
+
+
+class DeletedImageIndex:
+    def __init__(self, max_distance: int) -> None:
+        self._max_distance = max_distance
+        self._index = MultiIndexHash(max_distance)
+        self._last_id = STREAM_START_ID
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def sync(self, session: AsyncSession, redis: Redis) -> MultiIndexHash:
+        async with self._lock:
+            if self._loaded and await self._missed_entries(redis):
+                self._index, self._loaded = MultiIndexHash(self._max_distance), False
+            if not self._loaded:
+                latest = await redis.xrevrange(DELETED_HASHES_KEY, count=1)
+                self._last_id = latest[0][0] if latest else STREAM_START_ID
+                result = await session.execute(
+                    union_all(
+                        select(Image.image_id, Image.phash)
+                        .join(Message, Message.message_id == Image.message_id)
+                        .where(Message.status == "delete", Image.phash.is_not(None)),
+                        select(ImageArchive.image_id, ImageArchive.phash)
+                        .join(
+                            MessageArchive,
+                            (MessageArchive.message_id == ImageArchive.message_id)
+                            & (MessageArchive.archive_month == ImageArchive.archive_month),
+                        )
+                        .where(MessageArchive.status == "delete", ImageArchive.phash.is_not(None)),
+                    )
+                )
+                for image_id, phash in result:
+                    self._index.add(phash, image_id)
+                self._loaded = True
+                return self._index
+            entries = await redis.xrange(DELETED_HASHES_KEY, min=f"({self._last_id}", max="+")
+            for entry_id, fields in entries:
+                self._index.add(int(fields["phash"]), int(fields["image_id"]))
+                self._last_id = entry_id
+            return self._index
+
+    async def _missed_entries(self, redis: Redis) -> bool:
+        if self._last_id == STREAM_START_ID:
+            return await redis.xlen(DELETED_HASHES_KEY) >= DELETED_HASHES_MAXLEN
+        return not await redis.xrange(DELETED_HASHES_KEY, min=self._last_id, max=self._last_id, count=1)
+
+
+async def record_deleted_hashes(redis: Redis, hashes: list[tuple[int, int]]) -> None:
+    if not hashes:
+        return
+    async with redis.pipeline(transaction=False) as pipe:
+        for image_id, phash in hashes:
+            _ = pipe.xadd(
+                DELETED_HASHES_KEY,
+                {"image_id": image_id, "phash": phash},
+                maxlen=DELETED_HASHES_MAXLEN,
+                approximate=True,
+            )
+        _ = await pipe.execute()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Final
+
+from sqlalchemy import and_, delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.image import Image
+from app.models.message import Message
+from app.models.message_archive import ImageArchive, MessageArchive
+from app.schemas.box import MessageHistoryItem
+from app.services.message_search import MessageSearchFilters
+from app.services.partitions import archive_month, ensure_month_partitions, month_key
+
+
+ARCHIVABLE_STATUSES: Final = ("archived", "delete")
+ARCHIVE_TABLES: Final = (MessageArchive.__tablename__, ImageArchive.__tablename__)
+
+
+async def archive_messages(session: AsyncSession, older_than_days: int, batch_size: int) -> int:
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    candidates = (
+        select(Message.message_id)
+        .where(Message.status.in_(ARCHIVABLE_STATUSES), Message.created_at < cutoff)
+        .order_by(Message.message_id)
+        .limit(batch_size)
+    )
+    moved = 0
+    while True:
+        created = list((await session.scalars(candidates.with_only_columns(Message.created_at))).all())
+        await session.commit()
+        if not created:
+            return moved
+        await ensure_month_partitions(await session.connection(), {month_key(value) for value in created}, ARCHIVE_TABLES)
+        await session.commit()
+
+        message_ids = list((await session.scalars(candidates.with_for_update(skip_locked=True))).all())
+        if not message_ids:
+            await session.commit()
+            return moved
+        _ = await session.execute(
+            insert(MessageArchive).from_select(
+                ["message_id", "archive_month", "ip_address", "message_text", "tag", "status", "created_at"],
+                select(
+                    Message.message_id,
+                    archive_month(Message.created_at),
+                    Message.ip_address,
+                    Message.message_text,
+                    Message.tag,
+                    Message.status,
+                    Message.created_at,
+                ).where(Message.message_id.in_(message_ids)),
+            )
+        )
+        _ = await session.execute(
+            insert(ImageArchive).from_select(
+                [
+                    "image_id",
+                    "archive_month",
+                    "message_id",
+                    "image_path",
+                    "thumb_path",
+                    "jpg_path",
+                    "phash",
+                    "duplicate_of",
+                    "uploaded_at",
+                ],
+                select(
+                    Image.image_id,
+                    archive_month(Message.created_at),
+                    Image.message_id,
+                    Image.image_path,
+                    Image.thumb_path,
+                    Image.jpg_path,
+                    Image.phash,
+                    Image.duplicate_of,
+                    Image.uploaded_at,
+                )
+                .join(Message, Message.message_id == Image.message_id)
+                .where(Image.message_id.in_(message_ids)),
+            )
+        )
+        _ = await session.execute(delete(Image).where(Image.message_id.in_(message_ids)))
+        _ = await session.execute(delete(Message).where(Message.message_id.in_(message_ids)))
+        await session.commit()
+        moved += len(message_ids)
+
+
+def history_cursor(created_at: datetime, message_id: int) -> str:
+    return f"{created_at.isoformat()}_{message_id}"
+
+
+def parse_history_cursor(value: str) -> tuple[datetime, int]:
+    created_at, _, message_id = value.rpartition("_")
+    return datetime.fromisoformat(created_at), int(message_id)
+
+
+async def list_history(
+    session: AsyncSession,
+    filters: MessageSearchFilters,
+    before: tuple[datetime, int] | None,
+    page_size: int,
+) -> tuple[list[MessageHistoryItem], int, str | None]:
+    columns = ("message_id", "created_at", "message_text", "tag", "status")
+    branches = [
+        select(*(getattr(model, name) for name in columns), literal(archived).label("archived")).where(
+            *filters.clauses(model)
+        )
+        for model, archived in ((Message, False), (MessageArchive, True))
+    ]
+    total = await session.scalar(select(func.count()).select_from(union_all(*branches).subquery())) or 0
+
+    pages = []
+    for model, stmt in zip((Message, MessageArchive), branches):
+        if before is not None:
+            created_at, message_id = before
+            stmt = stmt.where(
+                or_(model.created_at < created_at, and_(model.created_at == created_at, model.message_id < message_id))
+            )
+        pages.append(
+            stmt.order_by(model.created_at.desc(), model.message_id.desc()).limit(page_size + 1).subquery().select()
+        )
+    history = union_all(*pages).subquery()
+    rows = (
+        await session.execute(
+            select(history)
+            .order_by(history.c.created_at.desc(), history.c.message_id.desc())
+            .limit(page_size + 1)
+        )
+    ).all()
+    next_before = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_before = history_cursor(rows[-1].created_at, rows[-1].message_id)
+    if not rows:
+        return [], total, None
+
+    hot_ids = [row.message_id for row in rows if not row.archived]
+    cold_ids = [row.message_id for row in rows if row.archived]
+    images: dict[tuple[int, bool], list[Image | ImageArchive]] = defaultdict(list)
+    if hot_ids:
+        for image in await session.scalars(
+            select(Image).where(Image.message_id.in_(hot_ids)).order_by(Image.image_id)
+        ):
+            images[(image.message_id, False)].append(image)
+    if cold_ids:
+        for image in await session.scalars(
+            select(ImageArchive).where(ImageArchive.message_id.in_(cold_ids)).order_by(ImageArchive.image_id)
+        ):
+            images[(image.message_id, True)].append(image)
+
+    items = []
+    for row in rows:
+        message_images = images[(row.message_id, bool(row.archived))]
+        items.append(
+            MessageHistoryItem(
+                id=row.message_id,
+                created_at=row.created_at,
+                msg=row.message_text,
+                tag=row.tag,
+                status=row.status,
+                archived=bool(row.archived),
+                images=[image.image_path for image in message_images],
+                images_thumb=[image.thumb_path for image in message_images],
+                images_jpg=[image.jpg_path for image in message_images],
+                images_duplicate_of=[image.duplicate_of for image in message_images],
+            )
+        )
+    return items, total, next_before
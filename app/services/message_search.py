@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Final
+
+from sqlalchemy import ColumnElement, func, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.message import Message
+from app.models.message_archive import MessageArchive
+
+
+NGRAM_TOKEN_SIZE: Final = 2
+MAX_SEARCH_TERMS: Final = 8
+
+
+@dataclass(frozen=True, slots=True)
+class MessageSearchFilters:
+    status: str | None = None
+    tag: str | None = None
+    start: date | None = None
+    end: date | None = None
+
+    def clauses(self, model: type[Message] | type[MessageArchive] = Message) -> list[ColumnElement[bool]]:
+        clauses: list[ColumnElement[bool]] = []
+        if self.status:
+            clauses.append(model.status == self.status)
+        if self.tag:
+            clauses.append(model.tag == self.tag)
+        if self.start:
+            clauses.append(model.created_at >= datetime.combine(self.start, time.min))
+        if self.end:
+            clauses.append(model.created_at < datetime.combine(self.end + timedelta(days=1), time.min))
+        return clauses
+
+
+def parse_search_terms(query: str) -> list[str]:
+    terms: list[str] = []
+    for raw in query.lower().split():
+        term = raw.replace('"', "").strip()
+        if term and term not in terms:
+            terms.append(term)
+    return terms[:MAX_SEARCH_TERMS]
+
+
+def highlight_offsets(text: str | None, terms: Iterable[str]) -> list[tuple[int, int]]:
+    if not text:
+        return []
+    folded = text.lower()
+    spans: list[tuple[int, int]] = []
+    for term in terms:
+        start = folded.find(term)
+        while start != -1:
+            spans.append((start, start + len(term)))
+            start = folded.find(term, start + len(term))
+    spans.sort()
+    merged: list[tuple[int, int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+async def search_messages(
+    session: AsyncSession,
+    terms: Sequence[str],
+    filters: MessageSearchFilters,
+    page: int,
+    page_size: int,
+) -> tuple[list[Message], int]:
+    clauses = filters.clauses()
+    fulltext = session.get_bind().dialect.name == "mysql"
+    indexed_terms = [term for term in terms if fulltext and len(term) >= NGRAM_TOKEN_SIZE]
+    if indexed_terms:
+        against = " ".join(f'+"{term}"' for term in indexed_terms)
+        clauses.append(match(Message.message_text, against=against).in_boolean_mode())
+    for term in terms:
+        if term not in indexed_terms:
+            clauses.append(Message.message_text.contains(term, autoescape=True))
+
+    total = await session.scalar(select(func.count()).select_from(Message).where(*clauses)) or 0
+    rows = await session.scalars(
+        select(Message)
+        .options(selectinload(Message.images))
+        .where(*clauses)
+        .order_by(Message.created_at.desc(), Message.message_id.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    )
+    return list(rows.all()), total
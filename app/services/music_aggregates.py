@@ -0,0 +1,51 @@
+from collections.abc import Iterable
+from typing import Final
+
+from sqlalchemy import ScalarSelect, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.music import Song, SongPerformance
+from app.services.music_rollup import refresh_monthly_rollup
+
+
+AGGREGATE_BATCH_SIZE: Final = 500
+
+
+def song_aggregate_values() -> dict[str, ScalarSelect[object]]:
+    belongs_to_song = SongPerformance.song_id == Song.song_id
+    return {
+        "performance_count": (
+            select(func.count()).select_from(SongPerformance).where(belongs_to_song).correlate(Song).scalar_subquery()
+        ),
+        "latest_performance_id": (
+            select(SongPerformance.performance_id)
+            .where(belongs_to_song)
+            .order_by(SongPerformance.performed_on.desc(), SongPerformance.performance_id.desc())
+            .limit(1)
+            .correlate(Song)
+            .scalar_subquery()
+        ),
+        "latest_performed_on": (
+            select(func.max(SongPerformance.performed_on)).where(belongs_to_song).correlate(Song).scalar_subquery()
+        ),
+    }
+
+
+async def refresh_song_aggregates(session: AsyncSession, song_ids: Iterable[int]) -> None:
+    ids = sorted(set(song_ids))
+    for start in range(0, len(ids), AGGREGATE_BATCH_SIZE):
+        _ = await session.execute(
+            update(Song)
+            .where(Song.song_id.in_(ids[start : start + AGGREGATE_BATCH_SIZE]))
+            .values(**song_aggregate_values())
+            .execution_options(synchronize_session=False)
+        )
+    await refresh_monthly_rollup(session, ids)
+
+
+async def rebuild_song_aggregates(session: AsyncSession) -> int:
+    song_ids = list((await session.scalars(select(Song.song_id).order_by(Song.song_id))).all())
+    for start in range(0, len(song_ids), AGGREGATE_BATCH_SIZE):
+        await refresh_song_aggregates(session, song_ids[start : start + AGGREGATE_BATCH_SIZE])
+        await session.commit()
+    return len(song_ids)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from typing import Final
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.music import Song, SongArtist
+
+
+ARTIST_NAME_LENGTH: Final = 255
+ARTIST_BATCH_SIZE: Final = 1000
+
+
+def song_artist_names(artist: str, artists: Sequence[str]) -> list[str]:
+    names: list[str] = []
+    for name in artists or [artist]:
+        name = " ".join(str(name).split())[:ARTIST_NAME_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+async def replace_song_artists(session: AsyncSession, songs: Mapping[int, Sequence[str]]) -> None:
+    if not songs:
+        return
+    _ = await session.execute(delete(SongArtist).where(SongArtist.song_id.in_(list(songs))))
+    rows = [{"song_id": song_id, "artist": name} for song_id, names in songs.items() for name in names]
+    if rows:
+        _ = await session.execute(insert(SongArtist), rows)
+
+
+async def backfill_song_artists(session: AsyncSession, batch_size: int = ARTIST_BATCH_SIZE) -> int:
+    processed = 0
+    last_song_id = 0
+    while True:
+        rows = (
+            await session.execute(
+                select(Song.song_id, Song.artist, Song.artists)
+                .where(Song.song_id > last_song_id)
+                .order_by(Song.song_id)
+                .limit(batch_size)
+            )
+        ).all()
+        if not rows:
+            return processed
+        await replace_song_artists(session, {song_id: song_artist_names(artist, artists) for song_id, artist, artists in rows})
+        await session.commit()
+        processed += len(rows)
+        last_song_id = rows[-1].song_id
+
+
+async def artist_counts(session: AsyncSession) -> list[dict[str, object]]:
+    rows = await session.execute(
+        select(SongArtist.artist, func.count(), func.coalesce(func.sum(Song.performance_count), 0))
+        .join(Song, Song.song_id == SongArtist.song_id)
+        .where(Song.status == "active")
+        .group_by(SongArtist.artist)
+        .order_by(SongArtist.artist)
+    )
+    return [
+        {"artist": artist, "songCount": song_count, "performanceCount": int(performance_count)}
+        for artist, song_count, performance_count in rows
+    ]
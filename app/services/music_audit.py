@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Final
+
+from sqlalchemy import ColumnElement, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.music import MusicAuditArchive, MusicAuditEvent
+from app.services.partitions import archive_month, ensure_month_partitions, month_key
+
+
+EXACT_COUNT_LIMIT: Final = 10_000
+AUDIT_COLUMNS: Final = ("audit_id", "actor", "action", "entity_type", "entity_id", "details", "revision", "created_at")
+
+AuditModel = type[MusicAuditEvent] | type[MusicAuditArchive]
+
+
+@dataclass(frozen=True, slots=True)
+class AuditFilters:
+    actor: str | None = None
+    action: str | None = None
+    entity_type: str | None = None
+    entity_id: str | None = None
+
+    def clauses(self, model: AuditModel = MusicAuditEvent) -> list[ColumnElement[bool]]:
+        clauses: list[ColumnElement[bool]] = []
+        if self.actor:
+            clauses.append(model.actor == self.actor)
+        if self.action:
+            clauses.append(model.action == self.action)
+        if self.entity_type:
+            clauses.append(model.entity_type == self.entity_type)
+        if self.entity_id:
+            clauses.append(model.entity_id == self.entity_id)
+        return clauses
+
+
+async def list_audit_events(
+    session: AsyncSession,
+    model: AuditModel,
+    filters: AuditFilters,
+    before: int | None,
+    limit: int,
+) -> tuple[list[MusicAuditEvent | MusicAuditArchive], int | None]:
+    stmt = select(model).where(*filters.clauses(model))
+    if before is not None:
+        stmt = stmt.where(model.audit_id < before)
+    rows = list((await session.scalars(stmt.order_by(model.audit_id.desc()).limit(limit + 1))).all())
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].audit_id
+    return rows, None
+
+
+async def approximate_total(session: AsyncSession, model: AuditModel, filters: AuditFilters) -> tuple[int, bool]:
+    clauses = filters.clauses(model)
+    if not clauses:
+        lowest, highest = (await session.execute(select(func.min(model.audit_id), func.max(model.audit_id)))).one()
+        return (highest - lowest + 1 if highest is not None else 0), False
+    capped = select(model.audit_id).where(*clauses).limit(EXACT_COUNT_LIMIT + 1).subquery()
+    total = await session.scalar(select(func.count()).select_from(capped)) or 0
+    return min(total, EXACT_COUNT_LIMIT), total <= EXACT_COUNT_LIMIT
+
+
+async def archive_audit_events(session: AsyncSession, older_than_days: int, batch_size: int) -> int:
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    candidates = (
+        select(MusicAuditEvent.audit_id)
+        .where(MusicAuditEvent.created_at < cutoff)
+        .order_by(MusicAuditEvent.audit_id)
+        .limit(batch_size)
+    )
+    moved = 0
+    while True:
+        created = list((await session.scalars(candidates.with_only_columns(MusicAuditEvent.created_at))).all())
+        await session.commit()
+        if not created:
+            return moved
+        await ensure_month_partitions(
+            await session.connection(),
+            {month_key(value) for value in created},
+            (MusicAuditArchive.__tablename__,),
+        )
+        await session.commit()
+
+        audit_ids = list((await session.scalars(candidates.with_for_update(skip_locked=True))).all())
+        if not audit_ids:
+            await session.commit()
+            return moved
+        _ = await session.execute(
+            insert(MusicAuditArchive).from_select(
+                ["archive_month", *AUDIT_COLUMNS],
+                select(
+                    archive_month(MusicAuditEvent.created_at),
+                    *(getattr(MusicAuditEvent, name) for name in AUDIT_COLUMNS),
+                ).where(MusicAuditEvent.audit_id.in_(audit_ids)),
+            )
+        )
+        _ = await session.execute(delete(MusicAuditEvent).where(MusicAuditEvent.audit_id.in_(audit_ids)))
+        await session.commit()
+        moved += len(audit_ids)
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import asyncio
+from array import array
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Final
+
+from redis.asyncio import Redis
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis import get_redis_client
+from app.db.session import async_session_factory
+from app.models.music import Song, SongPerformance
+from app.schemas.music import SongSummary
+from app.services.music_artists import song_artist_names
+from app.services.music_facets import CatalogSummary, summaries
+from app.services.music_search import SongSearchIndex
+from app.services.music_revision import read_revision, tracker
+
+
+SORT_MODES: Final = ("title", "recent", "count")
+MISSING_DATE: Final = -1
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogQuery:
+    q: str | None = None
+    search_mode: str = "title"
+    genre: str | None = None
+    language: str | None = None
+    work_type: str | None = None
+    artist: str | None = None
+    sort: str = "title"
+    order: str = "asc"
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogSnapshot:
+    revision: int
+    summaries: tuple[SongSummary, ...]
+    search: SongSearchIndex
+    genres: dict[str, frozenset[int]]
+    languages: dict[str, frozenset[int]]
+    work_types: dict[str, frozenset[int]]
+    artists: dict[str, frozenset[int]]
+    orders: dict[tuple[str, str], array[int]]
+    ranks: dict[tuple[str, str], array[int]]
+    counts: array[int]
+    latest: array[int]
+    summary: CatalogSummary
+
+    def query(self, query: CatalogQuery, offset: int, limit: int) -> tuple[list[SongSummary], int]:
+        matched = self._filtered(query)
+        if query.q:
+            scores = self.search.search(query.q, query.search_mode)
+            matched = set(scores) if matched is None else matched & scores.keys()
+            if query.sort == "relevance":
+                rank = self.ranks[("title", "asc")]
+                page = sorted(matched, key=lambda index: (-scores[index], rank[index]))[offset : offset + limit]
+                return [self.summaries[index] for index in page], len(matched)
+        sort_key = ("title", "asc") if query.sort == "relevance" else (query.sort, query.order)
+        order = self.orders[sort_key]
+        if matched is None:
+            page = order[offset : offset + limit]
+            return [self.summaries[index] for index in page], len(order)
+        if len(matched) * 8 < len(order):
+            rank = self.ranks[sort_key]
+            page = sorted(matched, key=rank.__getitem__)[offset : offset + limit]
+        else:
+            page = []
+            skipped = 0
+            for index in order:
+                if index not in matched:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                page.append(index)
+                if len(page) >= limit:
+                    break
+        return [self.summaries[index] for index in page], len(matched)
+
+    def matching(self, query: CatalogQuery) -> Sequence[int]:
+        matched = self._filtered(query)
+        return range(len(self.summaries)) if matched is None else sorted(matched)
+
+    def _filtered(self, query: CatalogQuery) -> set[int] | frozenset[int] | None:
+        candidate_sets: list[frozenset[int]] = []
+        for value, postings in (
+            (query.genre, self.genres),
+            (query.language, self.languages),
+            (query.work_type, self.work_types),
+            (query.artist, self.artists),
+        ):
+            if value:
+                candidate_sets.append(postings.get(value, frozenset()))
+        candidate_sets.sort(key=len)
+        matched: set[int] | frozenset[int] | None = None
+        for postings in candidate_sets:
+            matched = postings if matched is None else matched & postings
+        return matched
+
+
+def build_snapshot(
+    revision: int, rows: Sequence[Row[tuple[object, ...]]], summary: CatalogSummary
+) -> CatalogSnapshot:
+    summaries: list[SongSummary] = []
+    titles: list[str] = []
+    genres: dict[str, set[int]] = {}
+    languages: dict[str, set[int]] = {}
+    work_types: dict[str, set[int]] = {}
+    artists: dict[str, set[int]] = {}
+    song_ids = array("i")
+    counts = array("i")
+    latest = array("i")
+    for index, row in enumerate(rows):
+        summaries.append(
+            SongSummary(
+                song_id=row.song_id,
+                id=row.source_key,
+                source_key=row.source_key,
+                title=row.title,
+                artist=row.artist,
+                artists=row.artists,
+                genre=row.genre,
+                language=row.language,
+                workType=row.work_type,
+                notes=row.notes,
+                metadataStatus=row.metadata_status,
+                latestPerformanceAt=row.latest_performed_on,
+                latestLink=row.latest_link,
+                performanceCount=row.performance_count,
+            )
+        )
+        titles.append(row.title.casefold())
+        genres.setdefault(row.genre, set()).add(index)
+        languages.setdefault(row.language, set()).add(index)
+        work_types.setdefault(row.work_type, set()).add(index)
+        for name in song_artist_names(row.artist, row.artists):
+            artists.setdefault(name, set()).add(index)
+        song_ids.append(row.song_id)
+        counts.append(row.performance_count)
+        latest.append(row.latest_performed_on.toordinal() if row.latest_performed_on else MISSING_DATE)
+
+    sort_keys: dict[str, Callable[[int], object]] = {
+        "title": titles.__getitem__,
+        "recent": latest.__getitem__,
+        "count": counts.__getitem__,
+    }
+    orders: dict[tuple[str, str], array[int]] = {}
+    ranks: dict[tuple[str, str], array[int]] = {}
+    for sort in SORT_MODES:
+        key = sort_keys[sort]
+        for direction, reverse in (("asc", False), ("desc", True)):
+            ordered: list[int] = []
+            for value_group in _grouped(range(len(rows)), key, reverse):
+                ordered.extend(sorted(value_group, key=song_ids.__getitem__))
+            orders[(sort, direction)] = array("i", ordered)
+            rank = array("i", bytes(4 * len(rows)))
+            for position, index in enumerate(ordered):
+                rank[index] = position
+            ranks[(sort, direction)] = rank
+
+    return CatalogSnapshot(
+        revision=revision,
+        summaries=tuple(summaries),
+        search=SongSearchIndex([(summary.title, [summary.artist, *summary.artists]) for summary in summaries]),
+        genres={value: frozenset(indexes) for value, indexes in genres.items()},
+        languages={value: frozenset(indexes) for value, indexes in languages.items()},
+        work_types={value: frozenset(indexes) for value, indexes in work_types.items()},
+        artists={value: frozenset(indexes) for value, indexes in artists.items()},
+        orders=orders,
+        ranks=ranks,
+        counts=counts,
+        latest=latest,
+        summary=summary,
+    )
+
+
+def _grouped(indexes: range, key: Callable[[int], object], reverse: bool) -> list[list[int]]:
+    groups: dict[object, list[int]] = {}
+    for index in indexes:
+        groups.setdefault(key(index), []).append(index)
+    return [groups[value] for value in sorted(groups, reverse=reverse)]
+
+
+async def load_snapshot(session: AsyncSession, redis: Redis, revision: int) -> CatalogSnapshot:
+    summary = await summaries.load(session, redis, revision)
+    rows = (
+        await session.execute(
+            select(
+                Song.song_id,
+                Song.source_key,
+                Song.title,
+                Song.artist,
+                Song.artists,
+                Song.genre,
+                Song.language,
+                Song.work_type,
+                Song.notes,
+                Song.metadata_status,
+                Song.performance_count,
+                Song.latest_performed_on,
+                SongPerformance.clip_url.label("latest_link"),
+            )
+            .outerjoin(SongPerformance, SongPerformance.performance_id == Song.latest_performance_id)
+            .where(Song.status == "active")
+        )
+    ).all()
+    return await asyncio.to_thread(build_snapshot, revision, rows, summary)
+
+
+class CatalogSnapshotStore:
+    def __init__(self) -> None:
+        self._snapshot: CatalogSnapshot | None = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        revision = tracker.current()
+        if snapshot is not None and revision == snapshot.revision:
+            return snapshot
+        async with async_session_factory() as session:
+            revision = await tracker.resolve(session)
+            if snapshot is not None and snapshot.revision == revision:
+                return snapshot
+            async with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.revision != revision:
+                    revision = await read_revision(session)
+                    snapshot = await load_snapshot(session, await get_redis_client(), revision)
+                    self._snapshot = snapshot
+                return snapshot
+
+
+store = CatalogSnapshotStore()
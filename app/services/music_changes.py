@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Final
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.music import MusicAuditEvent, Song, SongPerformance
+from app.services.music_revision import read_revision
+
+
+MAX_CHANGE_REVISIONS: Final = 1000
+MAX_CHANGED_SONGS: Final = 500
+
+
+@dataclass(slots=True)
+class CatalogChanges:
+    since: int
+    revision: int
+    full: bool = False
+    song_ids: list[int] = field(default_factory=list)
+    removed_songs: list[str] = field(default_factory=list)
+    upserted_performances: list[str] = field(default_factory=list)
+    removed_performances: list[str] = field(default_factory=list)
+
+
+def _detail_song_id(details: dict[str, object]) -> int | None:
+    for key in ("after", "before"):
+        snapshot = details.get(key)
+        if isinstance(snapshot, dict) and isinstance(snapshot.get("song_id"), int):
+            return snapshot["song_id"]
+    return None
+
+
+async def collect_changes(session: AsyncSession, since: int) -> CatalogChanges:
+    revision = await read_revision(session)
+    changes = CatalogChanges(since=since, revision=revision)
+    if since == revision:
+        return changes
+    if since > revision or revision - since > MAX_CHANGE_REVISIONS:
+        changes.full = True
+        return changes
+
+    events = (
+        await session.execute(
+            select(
+                MusicAuditEvent.revision,
+                MusicAuditEvent.entity_type,
+                MusicAuditEvent.entity_id,
+                MusicAuditEvent.details,
+            ).where(MusicAuditEvent.revision > since, MusicAuditEvent.revision <= revision)
+        )
+    ).all()
+    if len({event.revision for event in events}) < revision - since:
+        changes.full = True
+        return changes
+
+    song_keys: set[str] = set()
+    song_ids: set[int] = set()
+    performance_keys: set[str] = set()
+    for event in events:
+        if event.entity_type == "song":
+            song_keys.add(event.entity_id)
+        elif event.entity_type == "performance":
+            performance_keys.add(event.entity_id)
+            song_id = _detail_song_id(event.details or {})
+            if song_id is not None:
+                song_ids.add(song_id)
+
+    visible_performances: set[str] = set()
+    if performance_keys:
+        for source_key, song_id, status in await session.execute(
+            select(SongPerformance.source_key, SongPerformance.song_id, Song.status)
+            .join(Song, Song.song_id == SongPerformance.song_id)
+            .where(SongPerformance.source_key.in_(performance_keys))
+        ):
+            song_ids.add(song_id)
+            if status == "active":
+                visible_performances.add(source_key)
+    changes.upserted_performances = sorted(visible_performances)
+    changes.removed_performances = sorted(performance_keys - visible_performances)
+
+    conditions = []
+    if song_keys:
+        conditions.append(Song.source_key.in_(song_keys))
+    if song_ids:
+        conditions.append(Song.song_id.in_(song_ids))
+    if conditions:
+        for song_id, source_key, status in await session.execute(
+            select(Song.song_id, Song.source_key, Song.status).where(or_(*conditions))
+        ):
+            if status == "active":
+                changes.song_ids.append(song_id)
+            else:
+                changes.removed_songs.append(source_key)
+    if len(changes.song_ids) > MAX_CHANGED_SONGS:
+        changes.full = True
+    changes.song_ids.sort()
+    changes.removed_songs.sort()
+    return changes
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import os
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+import brotli
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import async_session_factory
+from app.services.music_revision import REVISION_RECHECK_SECONDS, read_revision, revision_etag, tracker
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR: Final = Path("cache") / "music_export"
+ENCODING_SUFFIXES: Final = {"br": ".json.br", "gzip": ".json.gz", "identity": ".json"}
+KEEP_REVISIONS: Final = 3
+WRITE_BUFFER_BYTES: Final = 256 * 1024
+
+ExportChunks = Callable[[AsyncSession, int], AsyncIterator[bytes]]
+
+
+@dataclass(frozen=True, slots=True)
+class ExportArtifact:
+    revision: int
+    paths: dict[str, Path]
+
+    @property
+    def etag(self) -> str:
+        return revision_etag(self.revision)
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    accepted: set[str] = set()
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                with suppress(ValueError):
+                    quality = float(value)
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    for encoding in ("br", "gzip"):
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return "identity"
+
+
+def artifact_paths(revision: int) -> dict[str, Path]:
+    return {encoding: EXPORT_DIR / f"music-{revision}{suffix}" for encoding, suffix in ENCODING_SUFFIXES.items()}
+
+
+def existing_artifact(revision: int) -> ExportArtifact | None:
+    paths = artifact_paths(revision)
+    if all(path.exists() for path in paths.values()):
+        return ExportArtifact(revision=revision, paths=paths)
+    return None
+
+
+class ArtifactWriter:
+    def __init__(self, revision: int) -> None:
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        self.revision = revision
+        self._paths = artifact_paths(revision)
+        self._temporary = {
+            encoding: path.with_name(f"{path.name}.{os.getpid()}.tmp") for encoding, path in self._paths.items()
+        }
+        self._identity = self._temporary["identity"].open("wb")
+        self._gzip_file = self._temporary["gzip"].open("wb")
+        self._gzip = gzip.GzipFile(filename="", mode="wb", compresslevel=9, fileobj=self._gzip_file, mtime=0)
+        self._brotli_file = self._temporary["br"].open("wb")
+        self._brotli = brotli.Compressor(mode=brotli.MODE_TEXT)
+
+    def write(self, chunk: bytes) -> None:
+        _ = self._identity.write(chunk)
+        _ = self._gzip.write(chunk)
+        _ = self._brotli_file.write(self._brotli.process(chunk))
+
+    def finish(self) -> ExportArtifact:
+        _ = self._brotli_file.write(self._brotli.finish())
+        self._close()
+        for encoding in ("identity", "gzip", "br"):
+            os.replace(self._temporary[encoding], self._paths[encoding])
+        _prune(self.revision)
+        return ExportArtifact(revision=self.revision, paths=self._paths)
+
+    def abort(self) -> None:
+        self._close()
+        for path in self._temporary.values():
+            with suppress(FileNotFoundError):
+                path.unlink()
+
+    def _close(self) -> None:
+        self._identity.close()
+        self._gzip.close()
+        self._gzip_file.close()
+        self._brotli_file.close()
+
+
+async def write_artifact(revision: int, chunks: AsyncIterator[bytes]) -> ExportArtifact:
+    writer = await asyncio.to_thread(ArtifactWriter, revision)
+    try:
+        buffer = bytearray()
+        async for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= WRITE_BUFFER_BYTES:
+                await asyncio.to_thread(writer.write, bytes(buffer))
+                buffer.clear()
+        await asyncio.to_thread(writer.write, bytes(buffer))
+        return await asyncio.to_thread(writer.finish)
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def _prune(latest: int) -> None:
+    for path in EXPORT_DIR.glob("music-*.json*"):
+        revision = path.name.removeprefix("music-").split(".", 1)[0]
+        if revision.isdigit() and int(revision) <= latest - KEEP_REVISIONS:
+            with suppress(FileNotFoundError):
+                path.unlink()
+
+
+class ExportArtifactStore:
+    def __init__(self, build_chunks: ExportChunks) -> None:
+        self._build_chunks = build_chunks
+        self._artifact: ExportArtifact | None = None
+        self._task: asyncio.Task[ExportArtifact] | None = None
+        self._checked_at = 0.0
+
+    async def current(self) -> ExportArtifact:
+        artifact = self._artifact
+        if artifact is None:
+            return await asyncio.shield(self._schedule())
+        revision = await tracker.cached()
+        if revision is None:
+            if time.monotonic() - self._checked_at > REVISION_RECHECK_SECONDS:
+                _ = self._schedule()
+        elif revision != artifact.revision:
+            _ = self._schedule()
+        return artifact
+
+    async def close(self) -> None:
+        task = self._task
+        self._task = None
+        if task is not None and not task.done():
+            _ = task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def _schedule(self) -> asyncio.Task[ExportArtifact]:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+            self._task.add_done_callback(_log_failure)
+        return self._task
+
+    async def _refresh(self) -> ExportArtifact:
+        self._checked_at = time.monotonic()
+        async with async_session_factory() as session:
+            revision = await read_revision(session)
+            tracker.observe(revision, authoritative=True)
+            artifact = self._artifact
+            if artifact is None or artifact.revision != revision:
+                artifact = existing_artifact(revision)
+            if artifact is None:
+                artifact = await write_artifact(revision, self._build_chunks(session, revision))
+        self._artifact = artifact
+        return artifact
+
+
+def _log_failure(task: asyncio.Task[ExportArtifact]) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("[music] 生成曲库导出文件失败", exc_info=task.exception())
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Final
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.music import Song
+from app.services.music_revision import tracker
+
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_KEY_PREFIX: Final = "music:catalog:summary:"
+SUMMARY_TTL_SECONDS: Final = 24 * 3600
+FACET_NAMES: Final = ("genres", "languages", "workTypes")
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogSummary:
+    revision: int
+    facet_counts: dict[str, dict[str, int]]
+    active_songs: int
+    archived_songs: int
+    active_performances: int
+    performances: int
+
+    @property
+    def facets(self) -> dict[str, list[str]]:
+        return {name: list(counts) for name, counts in self.facet_counts.items()}
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"song_count": self.active_songs, "performance_count": self.active_performances}
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, raw: str) -> CatalogSummary:
+        return cls(**json.loads(raw))
+
+
+def summary_key(revision: int) -> str:
+    return f"{SUMMARY_KEY_PREFIX}{revision}"
+
+
+async def compute_summary(session: AsyncSession, revision: int) -> CatalogSummary:
+    rows = (
+        await session.execute(
+            select(
+                Song.status,
+                Song.genre,
+                Song.language,
+                Song.work_type,
+                func.count(),
+                func.coalesce(func.sum(Song.performance_count), 0),
+            ).group_by(Song.status, Song.genre, Song.language, Song.work_type)
+        )
+    ).all()
+    counters: dict[str, Counter[str]] = {name: Counter() for name in FACET_NAMES}
+    songs: Counter[str] = Counter()
+    performances: Counter[str] = Counter()
+    for status, genre, language, work_type, song_count, performance_count in rows:
+        songs[status] += song_count
+        performances[status] += int(performance_count)
+        if status != "active":
+            continue
+        counters["genres"][genre] += song_count
+        counters["languages"][language] += song_count
+        counters["workTypes"][work_type] += song_count
+    return CatalogSummary(
+        revision=revision,
+        facet_counts={name: dict(sorted(counter.items())) for name, counter in counters.items()},
+        active_songs=songs["active"],
+        archived_songs=songs["archived"],
+        active_performances=performances["active"],
+        performances=sum(performances.values()),
+    )
+
+
+class CatalogSummaryCache:
+    def __init__(self) -> None:
+        self._summary: CatalogSummary | None = None
+        self._lock = asyncio.Lock()
+
+    async def load(self, session: AsyncSession, redis: Redis, revision: int) -> CatalogSummary:
+        summary = self._summary
+        if summary is not None and summary.revision == revision:
+            return summary
+        async with self._lock:
+            summary = self._summary
+            if summary is None or summary.revision != revision:
+                summary = await self._shared(session, redis, revision)
+                self._summary = summary
+            return summary
+
+    async def get(self, session: AsyncSession, redis: Redis) -> CatalogSummary:
+        return await self.load(session, redis, await tracker.resolve(session))
+
+    async def _shared(self, session: AsyncSession, redis: Redis, revision: int) -> CatalogSummary:
+        key = summary_key(revision)
+        try:
+            raw = await redis.get(key)
+        except RedisError:
+            logger.warning("[music] 读取曲库统计缓存失败", exc_info=True)
+            return await compute_summary(session, revision)
+        if raw:
+            return CatalogSummary.loads(raw)
+        summary = await compute_summary(session, revision)
+        try:
+            _ = await redis.set(key, summary.dumps(), ex=SUMMARY_TTL_SECONDS, nx=True)
+        except RedisError:
+            logger.warning("[music] 写入曲库统计缓存失败", exc_info=True)
+        return summary
+
+
+summaries = CatalogSummaryCache()
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+from collections.abc import AsyncIterator, Iterable
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Final
+from uuid import uuid4
+
+from redis.exceptions import RedisError
+from sqlalchemy import Row, insert, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis import get_redis_client
+from app.db.session import async_session_factory
+from app.models.music import MusicAuditEvent, Song, SongPerformance
+from app.services.music_aggregates import refresh_song_aggregates
+from app.services.music_identifiers import derive_stream_id, generate_music_source_key
+from app.services.music_revision import pending_revision, publish_revision, read_revision
+from app.services.music_titles import TitleIndex, normalize_title, title_index
+from app.services.music_workbook import PerformanceImportRow, WorkbookIssue, iter_performance_workbook
+
+
+logger = logging.getLogger(__name__)
+
+IMPORT_JOB_KEY_PREFIX: Final = "music:import:job:"
+IMPORT_JOB_TTL_SECONDS: Final = 24 * 60 * 60
+IMPORT_PLATFORM: Final = "哔哩哔哩"
+INSERT_CHUNK_ROWS: Final = 1000
+PARSE_QUEUE_CHUNKS: Final = 4
+LOOKUP_CHUNK_PAIRS: Final = 500
+MAX_REPORTED_ISSUES: Final = 500
+MAX_PREVIEW_ROWS: Final = 500
+IMPORT_ACTIONS: Final = ("new", "updated", "unchanged")
+
+ParsedChunk = tuple[list[PerformanceImportRow], list[WorkbookIssue]]
+MatchKey = tuple[int, date, tuple[str, str | None]]
+
+
+@dataclass(slots=True)
+class ImportJob:
+    job_id: str
+    actor: str
+    mode: str = "insert"
+    dry_run: bool = False
+    status: str = "queued"
+    parsed_rows: int = 0
+    written_rows: int = 0
+    issue_count: int = 0
+    issues: list[WorkbookIssue] = field(default_factory=list)
+    result: dict[str, int] | None = None
+    error: str | None = None
+    counts: Counter[str] = field(default_factory=Counter)
+    preview: list[dict[str, object]] = field(default_factory=list)
+
+    def add_issues(self, issues: Iterable[WorkbookIssue]) -> None:
+        for issue in issues:
+            self.issue_count += 1
+            if len(self.issues) < MAX_REPORTED_ISSUES:
+                self.issues.append(issue)
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "job_id": self.job_id,
+            "mode": self.mode,
+            "dry_run": self.dry_run,
+            "status": self.status,
+            "parsed_rows": self.parsed_rows,
+            "written_rows": self.written_rows,
+            "summary": {action: self.counts[action] for action in IMPORT_ACTIONS},
+            "issue_count": self.issue_count,
+            "errors": [issue.as_dict() for issue in self.issues],
+            "result": self.result,
+            "error": self.error,
+            "preview": self.preview,
+        }
+
+
+async def parse_in_thread(contents: bytes) -> AsyncIterator[ParsedChunk]:
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[ParsedChunk | BaseException | None] = asyncio.Queue(maxsize=PARSE_QUEUE_CHUNKS)
+    stopped = threading.Event()
+
+    def put(item: ParsedChunk | BaseException | None) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce() -> None:
+        try:
+            for chunk in iter_performance_workbook(contents):
+                if stopped.is_set():
+                    return
+                put(chunk)
+        except Exception as exc:
+            put(exc)
+        else:
+            put(None)
+
+    producer = asyncio.create_task(asyncio.to_thread(produce))
+    try:
+        while (item := await queue.get()) is not None:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+        while not queue.empty():
+            _ = queue.get_nowait()
+        with suppress(Exception):
+            await producer
+
+
+async def _resolve_titles(session: AsyncSession, titles: set[str], matches: dict[str, list[int]]) -> None:
+    keys = {title: normalize_title(title) for title in titles - matches.keys()}
+    if not keys:
+        return
+    candidates: dict[str, list[tuple[int, str]]] = defaultdict(list)
+    for song_id, title in await session.execute(
+        select(Song.song_id, Song.title).where(or_(Song.title_key.in_(set(keys.values())), Song.title.in_(list(keys))))
+    ):
+        candidates[normalize_title(title)].append((song_id, title))
+    for title, title_key in keys.items():
+        exact = [song_id for song_id, candidate in candidates[title_key] if candidate == title]
+        matches[title] = exact if len(exact) == 1 else [song_id for song_id, _ in candidates[title_key]]
+
+
+def _title_issues(rows: list[PerformanceImportRow], matches: dict[str, list[int]], index: TitleIndex | None) -> list[WorkbookIssue]:
+    issues: list[WorkbookIssue] = []
+    for row in rows:
+        candidates = matches[row.song_title]
+        if not candidates:
+            suggestions = tuple(item.as_dict() for item in index.suggest(row.song_title)) if index is not None else ()
+            issues.append(WorkbookIssue(row.excel_row, "歌名", "SONG_NOT_FOUND", "数据库中不存在同名歌曲", suggestions))
+        elif len(candidates) > 1:
+            issues.append(WorkbookIssue(row.excel_row, "歌名", "AMBIGUOUS_SONG_TITLE", "数据库中存在多首同名歌曲"))
+    return issues
+
+
+async def _insert_chunked(session: AsyncSession, table: type[SongPerformance] | type[MusicAuditEvent], rows: list[dict[str, object]]) -> None:
+    for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+        _ = await session.execute(insert(table), rows[start : start + INSERT_CHUNK_ROWS])
+
+
+def _match_key(stream_id: str | None, clip_url: str | None) -> tuple[str, str | None]:
+    return ("stream", stream_id) if stream_id else ("clip", clip_url)
+
+
+async def _existing_performances(session: AsyncSession, pairs: set[tuple[int, date]]) -> dict[MatchKey, list[Row[Any]]]:
+    existing: dict[MatchKey, list[Row[Any]]] = defaultdict(list)
+    ordered = sorted(pairs)
+    for start in range(0, len(ordered), LOOKUP_CHUNK_PAIRS):
+        for row in await session.execute(
+            select(
+                SongPerformance.performance_id,
+                SongPerformance.source_key,
+                SongPerformance.song_id,
+                SongPerformance.performed_on,
+                SongPerformance.stream_id,
+                SongPerformance.stream_title,
+                SongPerformance.clip_url,
+            )
+            .where(tuple_(SongPerformance.song_id, SongPerformance.performed_on).in_(ordered[start : start + LOOKUP_CHUNK_PAIRS]))
+            .order_by(SongPerformance.performance_id)
+        ):
+            existing[(row.song_id, row.performed_on, _match_key(row.stream_id, row.clip_url))].append(row)
+    return existing
+
+
+async def import_workbook(session: AsyncSession, job: ImportJob, contents: bytes) -> None:
+    matches: dict[str, list[int]] = {}
+    index: TitleIndex | None = None
+    claimed: set[int] = set()
+    changes: list[tuple[str, str, int, dict[str, object]]] = []
+    async for rows, issues in parse_in_thread(contents):
+        job.parsed_rows += len(rows)
+        await _resolve_titles(session, {row.song_title for row in rows}, matches)
+        if index is None and any(not matches[row.song_title] for row in rows):
+            index = await title_index.get(session)
+        issues.extend(_title_issues(rows, matches, index))
+        job.add_issues(issues)
+        if not job.issue_count and rows:
+            planned = [(row, matches[row.song_title][0], derive_stream_id(None, row.clip_url)) for row in rows]
+            existing: dict[MatchKey, list[Row[Any]]] = {}
+            if job.mode == "upsert":
+                existing = await _existing_performances(session, {(song_id, row.performed_on) for row, song_id, _ in planned})
+            inserts: list[dict[str, object]] = []
+            updates: list[dict[str, object]] = []
+            for row, song_id, stream_id in planned:
+                candidates = existing.get((song_id, row.performed_on, _match_key(stream_id, row.clip_url)), [])
+                current = next((item for item in candidates if item.performance_id not in claimed), None)
+                if current is None:
+                    action = "new"
+                    source_key = generate_music_source_key("performance")
+                    inserts.append(
+                        {
+                            "source_key": source_key,
+                            "song_id": song_id,
+                            "performed_on": row.performed_on,
+                            "platform": IMPORT_PLATFORM,
+                            "stream_id": stream_id,
+                            "stream_title": row.stream_title,
+                            "stream_url": None,
+                            "clip_url": row.clip_url,
+                        }
+                    )
+                    details = {"after": {"song_id": song_id, "date": str(row.performed_on), "platform": IMPORT_PLATFORM}}
+                    changes.append(("performance.imported", source_key, song_id, details))
+                else:
+                    claimed.add(current.performance_id)
+                    if current.stream_title == row.stream_title and current.clip_url == row.clip_url:
+                        action = "unchanged"
+                    else:
+                        action = "updated"
+                        updates.append(
+                            {
+                                "performance_id": current.performance_id,
+                                "stream_id": stream_id,
+                                "stream_title": row.stream_title,
+                                "clip_url": row.clip_url,
+                            }
+                        )
+                        date_text = str(row.performed_on)
+                        details = {
+                            "before": {"source_key": current.source_key, "date": date_text, "stream_title": current.stream_title, "clip_url": current.clip_url},
+                            "after": {"source_key": current.source_key, "date": date_text, "stream_title": row.stream_title, "clip_url": row.clip_url},
+                        }
+                        changes.append(("performance.updated", current.source_key, song_id, details))
+                job.counts[action] += 1
+                if job.dry_run and action != "unchanged" and len(job.preview) < MAX_PREVIEW_ROWS:
+                    job.preview.append(
+                        {
+                            "row": row.excel_row,
+                            "action": action,
+                            "song_id": song_id,
+                            "performance_id": current.performance_id if current is not None else None,
+                        }
+                    )
+            if not job.dry_run:
+                await _insert_chunked(session, SongPerformance, inserts)
+                if updates:
+                    _ = await session.execute(update(SongPerformance), updates)
+                job.written_rows += len(inserts) + len(updates)
+        if not job.dry_run:
+            await jobs.save(job)
+    if job.issue_count:
+        await session.rollback()
+        job.status, job.written_rows = "failed", 0
+        job.issues.sort(key=lambda issue: issue.row)
+        return
+    if job.dry_run:
+        job.status = "succeeded"
+        return
+
+    song_counts = Counter(song_id for _, _, song_id, _ in changes)
+    if not changes:
+        job.status = "succeeded"
+        job.result = _import_result(job, song_counts, await read_revision(session))
+        return
+    await _insert_chunked(
+        session,
+        MusicAuditEvent,
+        [
+            {
+                "actor": job.actor,
+                "action": action,
+                "entity_type": "performance",
+                "entity_id": source_key,
+                "details": details,
+                "revision": pending_revision(session),
+            }
+            for action, source_key, _, details in changes
+        ],
+    )
+    by_count: dict[int, list[int]] = {}
+    for song_id, count in song_counts.items():
+        by_count.setdefault(count, []).append(song_id)
+    for count, song_ids in by_count.items():
+        _ = await session.execute(
+            update(Song)
+            .where(Song.song_id.in_(song_ids))
+            .values(version=Song.version + count)
+            .execution_options(synchronize_session=False)
+        )
+    await refresh_song_aggregates(session, song_counts)
+    await session.commit()
+    job.status = "succeeded"
+    job.result = _import_result(job, song_counts, await publish_revision(session))
+
+
+def _import_result(job: ImportJob, song_counts: Counter[int], revision: int) -> dict[str, int]:
+    return {
+        "imported_count": job.counts["new"],
+        "updated_count": job.counts["updated"],
+        "unchanged_count": job.counts["unchanged"],
+        "affected_song_count": len(song_counts),
+        "revision": revision,
+    }
+
+
+class ImportJobRunner:
+    def __init__(self) -> None:
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def submit(self, actor: str, contents: bytes, mode: str) -> ImportJob:
+        job = ImportJob(job_id=uuid4().hex, actor=actor, mode=mode)
+        await self.save(job)
+        task = asyncio.create_task(self._run(job, contents))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def preview(self, session: AsyncSession, actor: str, contents: bytes, mode: str) -> ImportJob:
+        job = ImportJob(job_id=uuid4().hex, actor=actor, mode=mode, dry_run=True, status="running")
+        await import_workbook(session, job, contents)
+        await self.save(job)
+        return job
+
+    async def get(self, job_id: str) -> dict[str, object] | None:
+        try:
+            redis = await get_redis_client()
+            payload = await redis.get(f"{IMPORT_JOB_KEY_PREFIX}{job_id}")
+        except RedisError:
+            logger.warning("[music] 读取导入任务状态失败：%s", job_id)
+            raise
+        return json.loads(payload) if payload else None
+
+    async def save(self, job: ImportJob) -> None:
+        try:
+            redis = await get_redis_client()
+            _ = await redis.set(
+                f"{IMPORT_JOB_KEY_PREFIX}{job.job_id}",
+                json.dumps(job.as_dict(), ensure_ascii=False),
+                ex=IMPORT_JOB_TTL_SECONDS,
+            )
+        except RedisError:
+            logger.warning("[music] 写入导入任务状态失败：%s", job.job_id)
+
+    async def close(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            _ = task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+
+    async def _run(self, job: ImportJob, contents: bytes) -> None:
+        job.status = "running"
+        await self.save(job)
+        try:
+            async with async_session_factory() as session:
+                await import_workbook(session, job, contents)
+        except asyncio.CancelledError:
+            job.status, job.written_rows, job.error = "failed", 0, "服务停止，导入已取消"
+            await asyncio.shield(self.save(job))
+            raise
+        except Exception:
+            logger.exception("[music] 演唱记录导入失败：%s", job.job_id)
+            job.status, job.written_rows, job.error = "failed", 0, "导入失败，未写入任何记录"
+        await self.save(job)
+
+
+jobs = ImportJobRunner()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import logging
+import random
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Sequence
+from datetime import date
+from itertools import accumulate
+from typing import Final
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.services.music_catalog import MISSING_DATE, CatalogQuery, CatalogSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+WEIGHT_MODES: Final = ("uniform", "inverse_count", "days_since")
+MAX_CACHED_SAMPLERS: Final = 128
+REJECTION_ATTEMPTS: Final = 16
+RECENT_KEY_PREFIX: Final = "music:random:recent:"
+RECENT_TTL_SECONDS: Final = 24 * 3600
+
+SamplerKey = tuple[int, int, str, str | None, str | None, str | None, str | None]
+
+
+def _weights(snapshot: CatalogSnapshot, indexes: Sequence[int], weight: str, today: int) -> list[float]:
+    if weight == "inverse_count":
+        return [1 / (snapshot.counts[index] + 1) for index in indexes]
+    if weight == "days_since":
+        days = [
+            max(1, today - snapshot.latest[index] + 1) if snapshot.latest[index] != MISSING_DATE else None
+            for index in indexes
+        ]
+        never = max((value for value in days if value is not None), default=0) + 1
+        return [never if value is None else value for value in days]
+    return [1.0] * len(indexes)
+
+
+class WeightedSampler:
+    def __init__(self, indexes: Sequence[int], song_ids: Sequence[int], weights: Sequence[float]) -> None:
+        self._indexes = array("i", indexes)
+        self._song_ids = array("i", song_ids)
+        self._weights = weights
+        self._prefix = array("d", accumulate(weights))
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def pick(self, rng: random.Random, excluded: set[int]) -> int | None:
+        if not self._indexes:
+            return None
+        total = self._prefix[-1]
+        for _ in range(REJECTION_ATTEMPTS):
+            position = min(bisect_right(self._prefix, rng.random() * total), len(self._indexes) - 1)
+            if self._song_ids[position] not in excluded:
+                return self._indexes[position]
+        remaining = [position for position, song_id in enumerate(self._song_ids) if song_id not in excluded]
+        if not remaining:
+            return None
+        position = rng.choices(remaining, weights=[self._weights[position] for position in remaining])[0]
+        return self._indexes[position]
+
+
+class SamplerCache:
+    def __init__(self) -> None:
+        self._samplers: OrderedDict[SamplerKey, WeightedSampler] = OrderedDict()
+
+    def get(self, snapshot: CatalogSnapshot, query: CatalogQuery, weight: str, today: date) -> WeightedSampler:
+        day = today.toordinal() if weight == "days_since" else 0
+        key = (snapshot.revision, day, weight, query.genre, query.language, query.work_type, query.artist)
+        sampler = self._samplers.get(key)
+        if sampler is not None:
+            self._samplers.move_to_end(key)
+            return sampler
+        indexes = snapshot.matching(query)
+        song_ids = [snapshot.summaries[index].song_id for index in indexes]
+        sampler = WeightedSampler(indexes, song_ids, _weights(snapshot, indexes, weight, day))
+        self._samplers[key] = sampler
+        while len(self._samplers) > MAX_CACHED_SAMPLERS:
+            _ = self._samplers.popitem(last=False)
+        return sampler
+
+
+async def recent_picks(redis: Redis, client: str, limit: int) -> list[int]:
+    try:
+        return [int(song_id) for song_id in await redis.lrange(f"{RECENT_KEY_PREFIX}{client}", 0, limit - 1)]
+    except RedisError:
+        logger.warning("[music] 读取随机点歌记录失败", exc_info=True)
+        return []
+
+
+async def remember_picks(redis: Redis, client: str, song_ids: Sequence[int], limit: int) -> None:
+    key = f"{RECENT_KEY_PREFIX}{client}"
+    try:
+        async with redis.pipeline(transaction=True) as pipe:
+            _ = pipe.lpush(key, *song_ids)
+            _ = pipe.ltrim(key, 0, limit - 1)
+            _ = pipe.expire(key, RECENT_TTL_SECONDS)
+            _ = await pipe.execute()
+    except RedisError:
+        logger.warning("[music] 写入随机点歌记录失败", exc_info=True)
+
+
+samplers = SamplerCache()
+rng = random.Random()
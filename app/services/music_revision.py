@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import secrets
+import time
+from collections.abc import Sequence
+from contextlib import suppress
+from typing import Final
+
+from redis.exceptions import RedisError
+from sqlalchemy import event, func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.redis import get_redis_client
+from app.db.session import async_session_factory
+from app.models.music import MusicAuditEvent, MusicCatalogRevision
+
+
+logger = logging.getLogger(__name__)
+
+REVISION_CHANNEL: Final = "music:catalog:revision"
+REVISION_KEY: Final = "music:catalog:revision:current"
+REVISION_MEMBER: Final = "revision"
+REVISION_RECHECK_SECONDS: Final = 5.0
+REVISION_DB_RECHECK_SECONDS: Final = 60.0
+LISTENER_RETRY_SECONDS: Final = 1.0
+PENDING_REVISION: Final = 0
+PENDING_TOKEN_RANGE: Final = 2**31 - 1
+PUBLISH_RETRY_SECONDS: Final = 2.0
+PUBLISH_SWEEP_SECONDS: Final = 30.0
+_SESSION_REVISION_KEY: Final = "music_catalog_revision"
+_SESSION_PENDING_KEY: Final = "music_pending_revision"
+
+
+async def read_revision(session: AsyncSession) -> int:
+    return (
+        await session.scalar(select(MusicCatalogRevision.revision).where(MusicCatalogRevision.id == 1))
+        or 0
+    )
+
+
+def revision_etag(revision: int) -> str:
+    return f'W/"music-{revision}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return any(candidate.strip() in (etag, "*") for candidate in if_none_match.split(","))
+
+
+class RevisionTracker:
+    def __init__(self) -> None:
+        self.revision: int | None = None
+        self._checked_at = 0.0
+        self._db_checked_at = 0.0
+        self._live = False
+        self._listener: asyncio.Task[None] | None = None
+        self._sweeper: asyncio.Task[None] | None = None
+        self._sweep_now: asyncio.Event | None = None
+        self._pending: set[asyncio.Task[None]] = set()
+
+    def current(self) -> int | None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        _ = self._ensure_sweeper()
+        now = time.monotonic()
+        if (
+            not self._live
+            or now - self._checked_at > REVISION_RECHECK_SECONDS
+            or now - self._db_checked_at > REVISION_DB_RECHECK_SECONDS
+        ):
+            return None
+        return self.revision
+
+    def observe(self, revision: int, *, authoritative: bool = False) -> None:
+        if self.revision is None or revision > self.revision or authoritative:
+            self.revision = revision
+        if authoritative:
+            self._checked_at = self._db_checked_at = time.monotonic()
+
+    async def cached(self) -> int | None:
+        revision = self.current()
+        if revision is not None or time.monotonic() - self._db_checked_at > REVISION_DB_RECHECK_SECONDS:
+            return revision
+        try:
+            redis = await get_redis_client()
+            score = await redis.zscore(REVISION_KEY, REVISION_MEMBER)
+        except RedisError:
+            logger.warning("[music] 读取 Redis 曲库版本失败", exc_info=True)
+            return None
+        if score is None:
+            return None
+        self.observe(int(score))
+        self._checked_at = time.monotonic()
+        return self.revision
+
+    async def resolve(self, session: AsyncSession) -> int:
+        revision = await self.cached()
+        if revision is not None:
+            return revision
+        revision = await read_revision(session)
+        self.observe(revision, authoritative=True)
+        self._publish_later(revision, announce=False)
+        return revision
+
+    def publish_later(self, revision: int) -> None:
+        self.observe(revision)
+        self._publish_later(revision, announce=True)
+
+    def request_sweep(self) -> None:
+        sweep_now = self._ensure_sweeper()
+        _ = asyncio.get_running_loop().call_later(PUBLISH_RETRY_SECONDS, sweep_now.set)
+
+    async def close(self) -> None:
+        for task in (self._listener, self._sweeper, *self._pending):
+            if task is None:
+                continue
+            _ = task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self._listener = None
+        self._sweeper = None
+        self._live = False
+
+    def _ensure_sweeper(self) -> asyncio.Event:
+        if self._sweep_now is None or self._sweeper is None or self._sweeper.done():
+            self._sweep_now = asyncio.Event()
+            self._sweeper = asyncio.create_task(self._sweep(self._sweep_now))
+        return self._sweep_now
+
+    def _publish_later(self, revision: int, *, announce: bool) -> None:
+        task = asyncio.get_running_loop().create_task(self._publish(revision, announce))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _publish(self, revision: int, announce: bool) -> None:
+        try:
+            redis = await get_redis_client()
+            _ = await redis.zadd(REVISION_KEY, {REVISION_MEMBER: revision}, gt=True)
+            if announce:
+                _ = await redis.publish(REVISION_CHANNEL, str(revision))
+        except RedisError:
+            logger.warning("[music] 曲库版本 %s 广播失败", revision, exc_info=True)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                redis = await get_redis_client()
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(REVISION_CHANNEL)
+                    self._live = True
+                    async for item in pubsub.listen():
+                        if item["type"] == "message":
+                            self.observe(int(item["data"]))
+            except (RedisError, OSError, ValueError):
+                logger.warning("[music] 曲库版本订阅中断，%.1f 秒后重连", LISTENER_RETRY_SECONDS, exc_info=True)
+            finally:
+                self._live = False
+            await asyncio.sleep(LISTENER_RETRY_SECONDS)
+
+    async def _sweep(self, sweep_now: asyncio.Event) -> None:
+        while True:
+            with suppress(TimeoutError):
+                await asyncio.wait_for(sweep_now.wait(), PUBLISH_SWEEP_SECONDS)
+            sweep_now.clear()
+            try:
+                revision = await publish_pending()
+            except SQLAlchemyError:
+                logger.warning("[music] 补发曲库版本失败，%.0f 秒后重试", PUBLISH_SWEEP_SECONDS, exc_info=True)
+                continue
+            if revision is not None:
+                logger.info("[music] 已补发曲库版本 %s", revision)
+
+
+tracker = RevisionTracker()
+
+
+def record_revision(session: AsyncSession, revision: int) -> None:
+    session.sync_session.info[_SESSION_REVISION_KEY] = revision
+
+
+def pending_revision(session: AsyncSession) -> int:
+    info = session.sync_session.info
+    if _SESSION_PENDING_KEY not in info:
+        info[_SESSION_PENDING_KEY] = -1 - secrets.randbelow(PENDING_TOKEN_RANGE)
+    return info[_SESSION_PENDING_KEY]
+
+
+async def publish_revision(session: AsyncSession) -> int:
+    pending = session.sync_session.info.pop(_SESSION_PENDING_KEY, None)
+    if pending is None:
+        return await read_revision(session)
+    try:
+        return await _allocate_revision(session, [pending])
+    except SQLAlchemyError:
+        logger.warning("[music] 曲库版本发布失败，稍后由后台补发", exc_info=True)
+        with suppress(SQLAlchemyError):
+            await session.rollback()
+        tracker.request_sweep()
+        return tracker.revision or 0
+
+
+async def publish_pending() -> int | None:
+    async with async_session_factory() as session:
+        pending = list(
+            (
+                await session.scalars(
+                    select(MusicAuditEvent.revision).where(MusicAuditEvent.revision <= PENDING_REVISION).distinct()
+                )
+            ).all()
+        )
+        await session.commit()
+        if not pending:
+            return None
+        return await _allocate_revision(session, pending)
+
+
+async def _allocate_revision(session: AsyncSession, pending: Sequence[int]) -> int:
+    counter = update(MusicCatalogRevision).where(MusicCatalogRevision.id == 1)
+    if (await session.connection()).dialect.name == "mysql":
+        _ = await session.execute(
+            counter.values(revision=func.last_insert_id(MusicCatalogRevision.revision + 1)).execution_options(
+                synchronize_session=False
+            )
+        )
+        revision = await session.scalar(select(func.last_insert_id())) or 0
+    else:
+        _ = await session.execute(
+            counter.values(revision=MusicCatalogRevision.revision + 1).execution_options(synchronize_session=False)
+        )
+        revision = await read_revision(session)
+    stamped = await session.execute(
+        update(MusicAuditEvent)
+        .where(MusicAuditEvent.revision.in_(pending))
+        .values(revision=revision)
+        .execution_options(synchronize_session=False)
+    )
+    if not stamped.rowcount:
+        await session.rollback()
+        return await read_revision(session)
+    record_revision(session, revision)
+    await session.commit()
+    return revision
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_revision(session: Session) -> None:
+    revision = session.info.pop(_SESSION_REVISION_KEY, None)
+    if revision is not None:
+        tracker.publish_later(revision)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_uncommitted_revision(session: Session) -> None:
+    _ = session.info.pop(_SESSION_REVISION_KEY, None)
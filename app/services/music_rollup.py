@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Final
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import async_session_factory
+from app.models.music import Song, SongPerformance, SongPerformanceMonthly
+from app.services.music_revision import tracker
+from app.services.partitions import archive_month
+
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_BATCH_SIZE: Final = 500
+ANALYTICS_KEY_PREFIX: Final = "music:analytics:"
+ANALYTICS_TTL_SECONDS: Final = 24 * 3600
+ROLLUP_DIMENSIONS: Final = {"genre": Song.genre, "language": Song.language}
+
+AnalyticsResult = list[dict[str, object]]
+
+
+def month_range(year: int, month: int | None) -> tuple[int, int]:
+    if month is None:
+        return year * 100 + 1, year * 100 + 12
+    return year * 100 + month, year * 100 + month
+
+
+def shift_month(month: int, delta: int) -> int:
+    index = month // 100 * 12 + month % 100 - 1 + delta
+    return index // 12 * 100 + index % 12 + 1
+
+
+async def refresh_monthly_rollup(session: AsyncSession, song_ids: Iterable[int]) -> None:
+    ids = sorted(set(song_ids))
+    month = archive_month(SongPerformance.performed_on)
+    for start in range(0, len(ids), ROLLUP_BATCH_SIZE):
+        batch = ids[start : start + ROLLUP_BATCH_SIZE]
+        _ = await session.execute(delete(SongPerformanceMonthly).where(SongPerformanceMonthly.song_id.in_(batch)))
+        _ = await session.execute(
+            insert(SongPerformanceMonthly).from_select(
+                ["song_id", "month", "performance_count", "first_performed_on", "last_performed_on"],
+                select(
+                    SongPerformance.song_id,
+                    month,
+                    func.count(),
+                    func.min(SongPerformance.performed_on),
+                    func.max(SongPerformance.performed_on),
+                )
+                .where(SongPerformance.song_id.in_(batch))
+                .group_by(SongPerformance.song_id, month),
+            )
+        )
+
+
+async def rebuild_monthly_rollup(session: AsyncSession, batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    song_ids = list((await session.scalars(select(Song.song_id).order_by(Song.song_id))).all())
+    for start in range(0, len(song_ids), batch_size):
+        await refresh_monthly_rollup(session, song_ids[start : start + batch_size])
+        await session.commit()
+    return len(song_ids)
+
+
+def _song_item(song_id: int, source_key: str, title: str, artist: str) -> dict[str, object]:
+    return {"song_id": song_id, "source_key": source_key, "title": title, "artist": artist}
+
+
+async def top_songs(session: AsyncSession, first_month: int, last_month: int, limit: int) -> AnalyticsResult:
+    count = func.sum(SongPerformanceMonthly.performance_count).label("performance_count")
+    rows = await session.execute(
+        select(Song.song_id, Song.source_key, Song.title, Song.artist, count)
+        .join(Song, Song.song_id == SongPerformanceMonthly.song_id)
+        .where(SongPerformanceMonthly.month.between(first_month, last_month), Song.status == "active")
+        .group_by(Song.song_id, Song.source_key, Song.title, Song.artist)
+        .order_by(count.desc(), Song.title, Song.song_id)
+        .limit(limit)
+    )
+    return [
+        {**_song_item(song_id, source_key, title, artist), "performanceCount": int(total)}
+        for song_id, source_key, title, artist, total in rows
+    ]
+
+
+async def debut_songs(session: AsyncSession, first_month: int, last_month: int) -> AnalyticsResult:
+    debuts = (
+        select(
+            SongPerformanceMonthly.song_id,
+            func.min(SongPerformanceMonthly.first_performed_on).label("first_performed_on"),
+        )
+        .group_by(SongPerformanceMonthly.song_id)
+        .having(func.min(SongPerformanceMonthly.month).between(first_month, last_month))
+        .subquery()
+    )
+    rows = await session.execute(
+        select(Song.song_id, Song.source_key, Song.title, Song.artist, debuts.c.first_performed_on)
+        .join(debuts, debuts.c.song_id == Song.song_id)
+        .where(Song.status == "active")
+        .order_by(debuts.c.first_performed_on, Song.title, Song.song_id)
+    )
+    return [
+        {**_song_item(song_id, source_key, title, artist), "firstPerformedOn": first_performed_on.isoformat()}
+        for song_id, source_key, title, artist, first_performed_on in rows
+    ]
+
+
+async def monthly_counts(session: AsyncSession, dimension: str, first_month: int, last_month: int) -> AnalyticsResult:
+    column = ROLLUP_DIMENSIONS[dimension]
+    rows = await session.execute(
+        select(SongPerformanceMonthly.month, column, func.sum(SongPerformanceMonthly.performance_count))
+        .join(Song, Song.song_id == SongPerformanceMonthly.song_id)
+        .where(SongPerformanceMonthly.month.between(first_month, last_month), Song.status == "active")
+        .group_by(SongPerformanceMonthly.month, column)
+        .order_by(SongPerformanceMonthly.month, column)
+    )
+    return [{"month": month, "value": value, "performanceCount": int(total)} for month, value, total in rows]
+
+
+def analytics_key(revision: int, name: str, *params: object) -> str:
+    return f"{ANALYTICS_KEY_PREFIX}{revision}:{name}:{':'.join(str(param) for param in params)}"
+
+
+async def _compute(compute: Callable[[AsyncSession], Awaitable[AnalyticsResult]]) -> AnalyticsResult:
+    async with async_session_factory() as session:
+        return await compute(session)
+
+
+async def cached_analytics(
+    redis: Redis,
+    name: str,
+    params: tuple[object, ...],
+    compute: Callable[[AsyncSession], Awaitable[AnalyticsResult]],
+) -> tuple[int, AnalyticsResult]:
+    revision = await tracker.cached()
+    if revision is None:
+        async with async_session_factory() as session:
+            revision = await tracker.resolve(session)
+    key = analytics_key(revision, name, *params)
+    try:
+        raw = await redis.get(key)
+    except RedisError:
+        logger.warning("[music] 读取演唱统计缓存失败", exc_info=True)
+        return revision, await _compute(compute)
+    if raw:
+        return revision, json.loads(raw)
+    items = await _compute(compute)
+    try:
+        _ = await redis.set(key, json.dumps(items, ensure_ascii=False, separators=(",", ":")), ex=ANALYTICS_TTL_SECONDS)
+    except RedisError:
+        logger.warning("[music] 写入演唱统计缓存失败", exc_info=True)
+    return revision, items
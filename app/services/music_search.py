@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import math
+import unicodedata
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Final
+
+from pypinyin import Style, lazy_pinyin
+
+
+MODE_FIELDS: Final = {"title": ("title",), "artist": ("artist",), "all": ("title", "artist")}
+FIELD_WEIGHTS: Final = {"title": 1.0, "artist": 0.8}
+TEXT_WEIGHT: Final = 1.0
+PINYIN_WEIGHT: Final = 0.9
+INITIALS_WEIGHT: Final = 0.8
+GRAM_SIZE: Final = 3
+SHORT_QUERY_LENGTH: Final = 5
+MIN_GRAM_OVERLAP: Final = 0.5
+EXACT_SCORE: Final = 1.0
+PREFIX_SCORE: Final = 0.9
+SUBSTRING_SCORE: Final = 0.75
+FUZZY_SCORE: Final = 0.6
+
+
+def normalize(text: str) -> str:
+    return "".join(char for char in unicodedata.normalize("NFKC", text).casefold() if char.isalnum())
+
+
+def _has_han(text: str) -> bool:
+    return any("㐀" <= char <= "鿿" for char in text)
+
+
+@lru_cache(maxsize=65536)
+def search_keys(text: str) -> tuple[tuple[str, float], ...]:
+    folded = normalize(text)
+    if not folded:
+        return ()
+    keys = [(folded, TEXT_WEIGHT)]
+    if _has_han(folded):
+        keys.append((normalize("".join(lazy_pinyin(folded))), PINYIN_WEIGHT))
+        keys.append((normalize("".join(lazy_pinyin(folded, style=Style.FIRST_LETTER))), INITIALS_WEIGHT))
+    return tuple(keys)
+
+
+def _grams(text: str, size: int) -> set[str]:
+    if len(text) <= size:
+        return {text}
+    return {text[index : index + size] for index in range(len(text) - size + 1)}
+
+
+@lru_cache(maxsize=65536)
+def index_grams(key: str) -> frozenset[str]:
+    return frozenset(gram for size in range(1, GRAM_SIZE + 1) for gram in _grams(key, size))
+
+
+def _score(needle: str, needle_grams: set[str], size: int, keys: Sequence[tuple[str, float]]) -> float:
+    best = 0.0
+    for key, weight in keys:
+        if key == needle:
+            score = EXACT_SCORE
+        elif key.startswith(needle):
+            score = PREFIX_SCORE
+        elif needle in key:
+            score = SUBSTRING_SCORE
+        elif best >= FUZZY_SCORE * weight:
+            continue
+        else:
+            overlap = len(needle_grams & index_grams(key))
+            dice = 2 * overlap / (len(needle_grams) + max(1, len(key) - size + 1))
+            score = FUZZY_SCORE * dice if dice >= MIN_GRAM_OVERLAP else 0.0
+        best = max(best, score * weight)
+    return best
+
+
+class SongSearchIndex:
+    def __init__(self, documents: Sequence[tuple[str, Sequence[str]]]) -> None:
+        self._keys: dict[str, list[tuple[tuple[str, float], ...]]] = {"title": [], "artist": []}
+        postings: dict[str, dict[str, list[int]]] = {"title": {}, "artist": {}}
+        for doc_id, (title, artists) in enumerate(documents):
+            names = list(dict.fromkeys(name for name in artists if name))
+            fields = {
+                "title": search_keys(title),
+                "artist": tuple(key for name in names for key in search_keys(name)),
+            }
+            for field, keys in fields.items():
+                self._keys[field].append(keys)
+                grams = frozenset().union(*(index_grams(key) for key, _ in keys))
+                field_postings = postings[field]
+                for gram in grams:
+                    field_postings.setdefault(gram, []).append(doc_id)
+        self._postings = {
+            field: {gram: array("i", doc_ids) for gram, doc_ids in field_postings.items()}
+            for field, field_postings in postings.items()
+        }
+
+    def search(self, query: str, mode: str = "all") -> dict[int, float]:
+        scores = self._search_term(normalize(query), mode)
+        terms = [term for term in (normalize(term) for term in query.split()) if term]
+        if len(terms) < 2:
+            return scores
+        combined = self._search_term(terms[0], mode)
+        for term in terms[1:]:
+            if not combined:
+                break
+            term_scores = self._search_term(term, mode)
+            combined = {
+                doc_id: score + term_scores[doc_id] for doc_id, score in combined.items() if doc_id in term_scores
+            }
+        for doc_id, score in combined.items():
+            scores[doc_id] = max(scores.get(doc_id, 0.0), score / len(terms))
+        return scores
+
+    def _search_term(self, needle: str, mode: str) -> dict[int, float]:
+        if not needle:
+            return {}
+        size = min(GRAM_SIZE if len(needle) > SHORT_QUERY_LENGTH else 2, len(needle))
+        needle_grams = _grams(needle, size)
+        required = len(needle_grams) if len(needle) <= 2 else math.ceil(len(needle_grams) * MIN_GRAM_OVERLAP)
+        scores: dict[int, float] = {}
+        for field in MODE_FIELDS[mode]:
+            postings = self._postings[field]
+            hits: Counter[int] = Counter()
+            for gram in needle_grams:
+                hits.update(postings.get(gram, ()))
+            keys = self._keys[field]
+            weight = FIELD_WEIGHTS[field]
+            for doc_id, count in hits.items():
+                if count < required:
+                    continue
+                score = _score(needle, needle_grams, size, keys[doc_id]) * weight
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
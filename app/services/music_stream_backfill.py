@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Final
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.music import MusicAuditEvent, SongPerformance
+from app.services.music_identifiers import derive_stream_id
+from app.services.music_revision import pending_revision, publish_revision
+
+
+BACKFILL_ACTOR: Final = "system:stream-id-backfill"
+STREAM_BACKFILL_BATCH_SIZE: Final = 1000
+
+
+async def backfill_stream_id_batch(session: AsyncSession, after_id: int, batch_size: int) -> tuple[int | None, int]:
+    rows = (
+        await session.execute(
+            select(
+                SongPerformance.performance_id,
+                SongPerformance.source_key,
+                SongPerformance.song_id,
+                SongPerformance.stream_url,
+                SongPerformance.clip_url,
+            )
+            .where(SongPerformance.performance_id > after_id, SongPerformance.stream_id.is_(None))
+            .order_by(SongPerformance.performance_id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+    ).all()
+    if not rows:
+        await session.commit()
+        return None, 0
+    values: list[dict[str, object]] = []
+    audits: list[dict[str, object]] = []
+    for performance_id, source_key, song_id, stream_url, clip_url in rows:
+        stream_id = derive_stream_id(stream_url, clip_url)
+        if stream_id is None:
+            continue
+        values.append({"performance_id": performance_id, "stream_id": stream_id})
+        audits.append(
+            {
+                "actor": BACKFILL_ACTOR,
+                "action": "performance.updated",
+                "entity_type": "performance",
+                "entity_id": source_key,
+                "details": {"after": {"song_id": song_id, "stream_id": stream_id}},
+                "revision": pending_revision(session),
+            }
+        )
+    if values:
+        _ = await session.execute(update(SongPerformance), values)
+        _ = await session.execute(insert(MusicAuditEvent), audits)
+    await session.commit()
+    if values:
+        _ = await publish_revision(session)
+    return rows[-1].performance_id, len(values)
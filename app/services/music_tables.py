@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+from typing import Final
+
+from sqlalchemy import JSON, Date, DateTime, Integer, Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.models.music import Song, SongPerformance
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+TABLE_BATCH_ROWS: Final = 10_000
+TABLE_FORMATS: Final = {"csv": "text/csv; charset=utf-8", "parquet": "application/vnd.apache.parquet"}
+EXPORT_TABLES: Final[dict[str, tuple[InstrumentedAttribute[object], ...]]] = {
+    "songs": (
+        Song.song_id,
+        Song.source_key,
+        Song.title,
+        Song.artist,
+        Song.artists,
+        Song.genre,
+        Song.language,
+        Song.work_type,
+        Song.notes,
+        Song.metadata_status,
+        Song.status,
+        Song.version,
+        Song.performance_count,
+        Song.latest_performed_on,
+        Song.created_at,
+        Song.updated_at,
+    ),
+    "performances": (
+        SongPerformance.performance_id,
+        SongPerformance.source_key,
+        SongPerformance.song_id,
+        SongPerformance.performed_on,
+        SongPerformance.platform,
+        SongPerformance.stream_id,
+        SongPerformance.stream_title,
+        SongPerformance.stream_url,
+        SongPerformance.clip_url,
+        SongPerformance.created_at,
+        SongPerformance.updated_at,
+    ),
+}
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+def table_filename(table: str, revision: int, fmt: str) -> str:
+    return f"music-{table}-{revision}.{fmt}"
+
+
+class CsvTableEncoder:
+    def __init__(self, columns: Sequence[InstrumentedAttribute[object]]) -> None:
+        self._names = [column.key for column in columns]
+        self._json_indexes = [index for index, column in enumerate(columns) if isinstance(column.type, JSON)]
+
+    def start(self) -> bytes:
+        return codecs.BOM_UTF8 + self._encode([self._names])
+
+    def encode(self, rows: Sequence[Row[tuple[object, ...]]]) -> bytes:
+        if not self._json_indexes:
+            return self._encode(rows)
+        values = [list(row) for row in rows]
+        for row in values:
+            for index in self._json_indexes:
+                row[index] = json.dumps(row[index], ensure_ascii=False)
+        return self._encode(values)
+
+    def finish(self) -> bytes:
+        return b""
+
+    def _encode(self, rows: Sequence[Sequence[object]]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_type(column: InstrumentedAttribute[object]) -> pa.DataType:
+    column_type = column.type
+    if isinstance(column_type, JSON):
+        return pa.list_(pa.string())
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("s")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+class ParquetTableEncoder:
+    def __init__(self, columns: Sequence[InstrumentedAttribute[object]]) -> None:
+        self._schema = pa.schema([(column.key, _arrow_type(column)) for column in columns])
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression="zstd")
+
+    def start(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows: Sequence[Row[tuple[object, ...]]]) -> bytes:
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), self._schema, strict=True)]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+async def table_chunks(session: AsyncSession, table: str, fmt: str) -> AsyncIterator[bytes]:
+    columns = EXPORT_TABLES[table]
+    encoder = CsvTableEncoder(columns) if fmt == "csv" else ParquetTableEncoder(columns)
+    yield encoder.start()
+    result = await session.stream(
+        select(*columns).order_by(columns[0]).execution_options(yield_per=TABLE_BATCH_ROWS)
+    )
+    async for rows in result.partitions():
+        yield await asyncio.to_thread(encoder.encode, rows)
+    yield encoder.finish()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from contextlib import suppress
+from pathlib import Path
+from typing import Final
+from uuid import uuid4
+
+from sqlalchemy import select
+
+from app.db.session import async_session_factory
+from app.models.music import Song
+from app.services.music_revision import read_revision
+from app.services.music_workbook import write_performance_template
+
+
+TEMPLATE_DIR: Final = Path("cache") / "music_template"
+KEEP_REVISIONS: Final = 3
+
+
+def template_path(revision: int) -> Path:
+    return TEMPLATE_DIR / f"performance-template-{revision}.xlsx"
+
+
+def _write_template(songs: list[tuple[str, str, str]], revision: int) -> Path:
+    TEMPLATE_DIR.mkdir(parents=True, exist_ok=True)
+    path = template_path(revision)
+    temporary = path.with_name(f"{path.name}.{uuid4().hex}.tmp")
+    try:
+        write_performance_template(songs, temporary)
+        os.replace(temporary, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            temporary.unlink()
+        raise
+    _prune(revision)
+    return path
+
+
+def _prune(latest: int) -> None:
+    for path in TEMPLATE_DIR.glob("performance-template-*.xlsx"):
+        revision = path.name.removeprefix("performance-template-").removesuffix(".xlsx")
+        if revision.isdigit() and int(revision) <= latest - KEEP_REVISIONS:
+            with suppress(FileNotFoundError):
+                path.unlink()
+
+
+class TemplateStore:
+    def __init__(self) -> None:
+        self._builds: dict[int, asyncio.Task[tuple[int, Path]]] = {}
+
+    async def get(self, revision: int) -> tuple[int, Path]:
+        path = template_path(revision)
+        if path.exists():
+            return revision, path
+        task = self._builds.get(revision)
+        if task is None:
+            task = asyncio.create_task(self._build())
+            self._builds[revision] = task
+            task.add_done_callback(lambda _: self._builds.pop(revision, None))
+        return await asyncio.shield(task)
+
+    async def close(self) -> None:
+        tasks = list(self._builds.values())
+        self._builds.clear()
+        for task in tasks:
+            _ = task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    async def _build(self) -> tuple[int, Path]:
+        async with async_session_factory() as session:
+            revision = await read_revision(session)
+            path = template_path(revision)
+            if path.exists():
+                return revision, path
+            songs = list(
+                (
+                    await session.execute(
+                        select(Song.title, Song.artist, Song.status).order_by(Song.title, Song.song_id)
+                    )
+                ).tuples()
+            )
+        return revision, await asyncio.to_thread(_write_template, songs, revision)
+
+
+templates = TemplateStore()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import unicodedata
+from collections import Counter, defaultdict
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Final
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.music import Song
+from app.services.music_revision import tracker
+
+
+TITLE_KEY_LENGTH: Final = 255
+TITLE_KEY_BATCH_SIZE: Final = 1000
+MAX_SUGGESTIONS: Final = 3
+MIN_SUGGESTION_SCORE: Final = 0.3
+
+
+def normalize_title(title: str) -> str:
+    folded = unicodedata.normalize("NFKC", title).casefold()
+    key = "".join(char for char in folded if not char.isspace() and unicodedata.category(char)[0] not in "PS")
+    return (key or " ".join(folded.split()))[:TITLE_KEY_LENGTH]
+
+
+def title_key_values(values: Mapping[str, object]) -> dict[str, str]:
+    title = values.get("title")
+    return {"title_key": normalize_title(title)} if isinstance(title, str) else {}
+
+
+def _grams(key: str) -> set[str]:
+    if len(key) < 2:
+        return {key}
+    return {key[index : index + 2] for index in range(len(key) - 1)}
+
+
+@dataclass(frozen=True, slots=True)
+class TitleSuggestion:
+    song_id: int
+    title: str
+    score: float
+
+    def as_dict(self) -> dict[str, int | str | float]:
+        return {"song_id": self.song_id, "title": self.title, "score": self.score}
+
+
+class TitleIndex:
+    def __init__(self, revision: int, songs: Sequence[tuple[int, str]]) -> None:
+        self.revision = revision
+        self._songs = songs
+        self._sizes: list[int] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        for position, (_, title) in enumerate(songs):
+            grams = _grams(normalize_title(title))
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings[gram].append(position)
+
+    def suggest(self, title: str, limit: int = MAX_SUGGESTIONS) -> list[TitleSuggestion]:
+        grams = _grams(normalize_title(title))
+        overlaps: Counter[int] = Counter()
+        for gram in grams:
+            overlaps.update(self._postings.get(gram, ()))
+        scored = (
+            (2 * overlap / (len(grams) + self._sizes[position]), position) for position, overlap in overlaps.items()
+        )
+        best = heapq.nlargest(limit, (item for item in scored if item[0] >= MIN_SUGGESTION_SCORE))
+        return [
+            TitleSuggestion(song_id=self._songs[position][0], title=self._songs[position][1], score=round(score, 3))
+            for score, position in best
+        ]
+
+
+class TitleIndexStore:
+    def __init__(self) -> None:
+        self._index: TitleIndex | None = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, session: AsyncSession) -> TitleIndex:
+        revision = await tracker.resolve(session)
+        index = self._index
+        if index is not None and index.revision == revision:
+            return index
+        async with self._lock:
+            index = self._index
+            if index is None or index.revision != revision:
+                songs = (await session.execute(select(Song.song_id, Song.title))).tuples().all()
+                index = await asyncio.to_thread(TitleIndex, revision, songs)
+                self._index = index
+            return index
+
+
+async def refresh_title_keys(session: AsyncSession, batch_size: int = TITLE_KEY_BATCH_SIZE) -> int:
+    updated = 0
+    last_song_id = 0
+    while True:
+        rows = (
+            await session.execute(
+                select(Song.song_id, Song.title, Song.title_key)
+                .where(Song.song_id > last_song_id)
+                .order_by(Song.song_id)
+                .limit(batch_size)
+            )
+        ).all()
+        if not rows:
+            return updated
+        values = [
+            {"song_id": song_id, "title_key": key}
+            for song_id, title, current in rows
+            if (key := normalize_title(title)) != current
+        ]
+        if values:
+            _ = await session.execute(update(Song), values)
+        await session.commit()
+        updated += len(values)
+        last_song_id = rows[-1].song_id
+
+
+title_index = TitleIndexStore()
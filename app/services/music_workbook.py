@@ -1,23 +1,25 @@
+from collections.abc import Iterator, Sequence
 from dataclasses import dataclass
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from io import BytesIO
-from typing import Final, Protocol, TypeAlias
+from pathlib import Path
+from typing import Final, TypeAlias
 from urllib.parse import urlsplit
 from zipfile import BadZipFile
 
 from openpyxl import Workbook, load_workbook
+from openpyxl.cell.cell import Cell, WriteOnlyCell
 from openpyxl.cell.rich_text import CellRichText
 from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 from openpyxl.worksheet.formula import ArrayFormula, DataTableFormula
-from openpyxl.worksheet.worksheet import Worksheet
-
-from app.models.music import Song
 
 
 IMPORT_SHEET: Final = "导入数据"
 SONG_LIST_SHEET: Final = "歌曲列表"
 IMPORT_HEADERS: Final = ("歌名", "日期", "直播标题", "歌切链接")
+PARSE_CHUNK_ROWS: Final = 1000
 ExcelValue: TypeAlias = (
     bool
     | int
@@ -35,10 +37,6 @@ ExcelValue: TypeAlias = (
 )
 
 
-class WorkbookSheetFactory(Protocol):
-    def create_sheet(self, title: str, index: int | None = None) -> Worksheet: ...
-
-
 @dataclass(frozen=True, slots=True)
 class PerformanceImportRow:
     excel_row: int
@@ -54,81 +52,100 @@ class WorkbookIssue:
     field: str
     code: str
     message: str
+    suggestions: tuple[dict[str, object], ...] = ()
 
-    def as_dict(self) -> dict[str, int | str]:
-        return {
+    def as_dict(self) -> dict[str, object]:
+        payload: dict[str, object] = {
             "row": self.row,
             "field": self.field,
             "code": self.code,
             "message": self.message,
         }
+        if self.suggestions:
+            payload["suggestions"] = list(self.suggestions)
+        return payload
 
 
-def build_performance_template(songs: list[Song]) -> BytesIO:
-    workbook = Workbook()
-    import_sheet = workbook.active
-    if import_sheet is None:
-        raise RuntimeError("Workbook has no active worksheet")
-    import_sheet.title = IMPORT_SHEET
-    import_sheet.append(IMPORT_HEADERS)
+def write_performance_template(songs: Sequence[tuple[str, str, str]], path: Path) -> None:
+    workbook = Workbook(write_only=True)
+    import_sheet = workbook.create_sheet(IMPORT_SHEET)
     import_sheet.freeze_panes = "A2"
     import_sheet.auto_filter.ref = "A1:D1"
-    _style_header(import_sheet)
     _set_widths(import_sheet, (28, 16, 32, 56))
+    import_sheet.append(_header_cells(import_sheet, IMPORT_HEADERS))
 
-    song_sheet = _create_sheet(workbook, SONG_LIST_SHEET)
-    song_sheet.append(("歌名", "歌手", "状态"))
-    for song in songs:
-        song_sheet.append((song.title, song.artist, "公开" if song.status == "active" else "归档"))
+    song_sheet = workbook.create_sheet(SONG_LIST_SHEET)
     song_sheet.freeze_panes = "A2"
-    song_sheet.auto_filter.ref = f"A1:C{max(song_sheet.max_row, 1)}"
-    _style_header(song_sheet)
+    song_sheet.auto_filter.ref = f"A1:C{len(songs) + 1}"
     _set_widths(song_sheet, (32, 32, 12))
-
-    output = BytesIO()
-    _ = workbook.save(output)
-    _ = output.seek(0)
-    return output
+    song_sheet.append(_header_cells(song_sheet, ("歌名", "歌手", "状态")))
+    for title, artist, status in songs:
+        song_sheet.append((title, artist, "公开" if status == "active" else "归档"))
+    workbook.save(path)
 
 
 def parse_performance_workbook(contents: bytes) -> tuple[list[PerformanceImportRow], list[WorkbookIssue]]:
+    rows: list[PerformanceImportRow] = []
+    issues: list[WorkbookIssue] = []
+    for chunk_rows, chunk_issues in iter_performance_workbook(contents):
+        rows.extend(chunk_rows)
+        issues.extend(chunk_issues)
+    return rows, issues
+
+
+def iter_performance_workbook(
+    contents: bytes,
+    chunk_size: int = PARSE_CHUNK_ROWS,
+) -> Iterator[tuple[list[PerformanceImportRow], list[WorkbookIssue]]]:
     try:
         workbook = load_workbook(BytesIO(contents), read_only=True, data_only=True)
     except (BadZipFile, OSError, ValueError, KeyError) as exc:
-        return [], [WorkbookIssue(1, "file", "INVALID_XLSX", f"无法读取 XLSX：{exc}")]
-
-    if IMPORT_SHEET not in workbook.sheetnames:
-        return [], [WorkbookIssue(1, "sheet", "MISSING_SHEET", f"缺少工作表“{IMPORT_SHEET}”")]
-    sheet = workbook[IMPORT_SHEET]
-    values = sheet.iter_rows(values_only=True)
-    header = next(values, None)
-    if tuple(header or ()) != IMPORT_HEADERS:
-        return [], [WorkbookIssue(1, "header", "INVALID_HEADERS", "表头必须依次为：歌名、日期、直播标题、歌切链接")]
+        yield [], [WorkbookIssue(1, "file", "INVALID_XLSX", f"无法读取 XLSX：{exc}")]
+        return
 
-    rows: list[PerformanceImportRow] = []
-    issues: list[WorkbookIssue] = []
-    seen: set[tuple[str, date, str]] = set()
-    for excel_row, raw in enumerate(values, start=2):
-        if not raw or all(value is None or value == "" for value in raw):
-            continue
-        title = _required_text(raw[0] if len(raw) > 0 else None)
-        performed_on = _date_value(raw[1] if len(raw) > 1 else None)
-        stream_title = _required_text(raw[2] if len(raw) > 2 else None)
-        clip_url = _required_text(raw[3] if len(raw) > 3 else None)
-        row_issues = _row_issues(excel_row, title, performed_on, stream_title, clip_url)
-        if row_issues:
-            issues.extend(row_issues)
-            continue
-        assert title is not None and performed_on is not None and stream_title is not None and clip_url is not None
-        key = (title, performed_on, clip_url)
-        if key in seen:
-            issues.append(WorkbookIssue(excel_row, "row", "DUPLICATE_ROW", "文件内存在重复演唱记录"))
-            continue
-        seen.add(key)
-        rows.append(PerformanceImportRow(excel_row, title, performed_on, stream_title, clip_url))
-    if not rows and not issues:
-        issues.append(WorkbookIssue(2, "row", "EMPTY_IMPORT", "导入数据中没有可导入记录"))
-    return rows, issues
+    try:
+        if IMPORT_SHEET not in workbook.sheetnames:
+            yield [], [WorkbookIssue(1, "sheet", "MISSING_SHEET", f"缺少工作表“{IMPORT_SHEET}”")]
+            return
+        sheet = workbook[IMPORT_SHEET]
+        values = sheet.iter_rows(values_only=True)
+        header = next(values, None)
+        if tuple(header or ()) != IMPORT_HEADERS:
+            yield [], [WorkbookIssue(1, "header", "INVALID_HEADERS", "表头必须依次为：歌名、日期、直播标题、歌切链接")]
+            return
+
+        rows: list[PerformanceImportRow] = []
+        issues: list[WorkbookIssue] = []
+        seen: set[tuple[str, date, str]] = set()
+        parsed = 0
+        for excel_row, raw in enumerate(values, start=2):
+            if not raw or all(value is None or value == "" for value in raw):
+                continue
+            parsed += 1
+            title = _required_text(raw[0] if len(raw) > 0 else None)
+            performed_on = _date_value(raw[1] if len(raw) > 1 else None)
+            stream_title = _required_text(raw[2] if len(raw) > 2 else None)
+            clip_url = _required_text(raw[3] if len(raw) > 3 else None)
+            row_issues = _row_issues(excel_row, title, performed_on, stream_title, clip_url)
+            if row_issues:
+                issues.extend(row_issues)
+            else:
+                assert title is not None and performed_on is not None and stream_title is not None and clip_url is not None
+                key = (title, performed_on, clip_url)
+                if key in seen:
+                    issues.append(WorkbookIssue(excel_row, "row", "DUPLICATE_ROW", "文件内存在重复演唱记录"))
+                else:
+                    seen.add(key)
+                    rows.append(PerformanceImportRow(excel_row, title, performed_on, stream_title, clip_url))
+            if len(rows) + len(issues) >= chunk_size:
+                yield rows, issues
+                rows, issues = [], []
+        if not parsed:
+            issues.append(WorkbookIssue(2, "row", "EMPTY_IMPORT", "导入数据中没有可导入记录"))
+        if rows or issues:
+            yield rows, issues
+    finally:
+        workbook.close()
 
 
 def _required_text(value: ExcelValue) -> str | None:
@@ -175,18 +192,19 @@ def _row_issues(
     return issues
 
 
-def _style_header(sheet: Worksheet) -> None:
+def _header_cells(sheet: WriteOnlyWorksheet, headers: tuple[str, ...]) -> list[Cell]:
     fill = PatternFill("solid", fgColor="282837")
-    for cell in sheet[1]:
-        cell.fill = fill
-        cell.font = Font(color="FFFFFF", bold=True)
-        cell.alignment = Alignment(horizontal="center")
+    font = Font(color="FFFFFF", bold=True)
+    alignment = Alignment(horizontal="center")
+    cells: list[Cell] = []
+    for header in headers:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.fill, cell.font, cell.alignment = fill, font, alignment
+        cells.append(cell)
+    return cells
 
 
-def _set_widths(sheet: Worksheet, widths: tuple[int, ...]) -> None:
+def _set_widths(sheet: WriteOnlyWorksheet, widths: tuple[int, ...]) -> None:
     for index, width in enumerate(widths, start=1):
         sheet.column_dimensions[chr(64 + index)].width = width
 
-
-def _create_sheet(workbook: WorkbookSheetFactory, title: str) -> Worksheet:
-    return workbook.create_sheet(title)
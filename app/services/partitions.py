@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Final
+
+from sqlalchemy import ColumnElement, extract, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+CATCH_ALL_PARTITION: Final = "pmax"
+
+
+def month_key(value: date) -> int:
+    return value.year * 100 + value.month
+
+
+def _next_month_key(month: int) -> int:
+    year, month_of_year = divmod(month, 100)
+    return (year + 1) * 100 + 1 if month_of_year == 12 else month + 1
+
+
+def archive_month(created_at: InstrumentedAttribute[datetime] | InstrumentedAttribute[date]) -> ColumnElement[int]:
+    return extract("year", created_at) * 100 + extract("month", created_at)
+
+
+async def ensure_month_partitions(connection: AsyncConnection, months: set[int], tables: tuple[str, ...]) -> None:
+    if connection.dialect.name != "mysql" or not months:
+        return
+    for table_name in tables:
+        result = await connection.execute(
+            text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+            ),
+            {"table_name": table_name},
+        )
+        existing = {int(name[1:]) for (name,) in result if name and name != CATCH_ALL_PARTITION}
+        latest = max(existing, default=0)
+        missing = sorted(month for month in months if month > latest)
+        if not missing:
+            continue
+        partitions = ", ".join(
+            f"PARTITION p{month} VALUES LESS THAN ({_next_month_key(month)})" for month in missing
+        )
+        _ = await connection.execute(
+            text(
+                f"ALTER TABLE {table_name} REORGANIZE PARTITION {CATCH_ALL_PARTITION} INTO "
+                f"({partitions}, PARTITION {CATCH_ALL_PARTITION} VALUES LESS THAN MAXVALUE)"
+            )
+        )
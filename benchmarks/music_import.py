@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date, timedelta
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from openpyxl import Workbook  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models.music import MusicAuditEvent, SongPerformance  # noqa: E402
+from app.services.music_import_jobs import INSERT_CHUNK_ROWS, parse_in_thread  # noqa: E402
+from app.services.music_workbook import IMPORT_HEADERS, IMPORT_SHEET, parse_performance_workbook  # noqa: E402
+from music_list import seed  # noqa: E402
+
+
+def build_workbook(rows: int, songs: int) -> bytes:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(IMPORT_SHEET)
+    sheet.append(IMPORT_HEADERS)
+    start = date(2020, 1, 1)
+    for index in range(rows):
+        sheet.append(
+            (
+                f"歌曲{index % songs}",
+                start + timedelta(days=index % 2000),
+                "直播",
+                f"https://www.bilibili.com/video/BV1{index:09d}",
+            )
+        )
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+async def loop_stall(contents: bytes) -> tuple[float, float]:
+    stall = 0.0
+    running = True
+
+    async def heartbeat() -> None:
+        nonlocal stall
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - started - 0.001)
+
+    task = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    async for _ in parse_in_thread(contents):
+        pass
+    elapsed = time.perf_counter() - started
+    running = False
+    await task
+    return elapsed, stall
+
+
+def performance_values(index: int) -> dict[str, object]:
+    return {
+        "source_key": f"performance_import_{index}",
+        "song_id": index % 1000 + 1,
+        "performed_on": date(2020, 1, 1) + timedelta(days=index % 2000),
+        "platform": "哔哩哔哩",
+        "stream_title": "直播",
+        "clip_url": f"https://www.bilibili.com/video/BV1{index:09d}",
+    }
+
+
+def audit_values(index: int) -> dict[str, object]:
+    return {
+        "actor": "benchmark",
+        "action": "performance.imported",
+        "entity_type": "performance",
+        "entity_id": f"performance_import_{index}",
+        "details": {},
+        "revision": 1,
+    }
+
+
+def orm_rows(session: Session, rows: int) -> None:
+    for index in range(rows):
+        session.add(SongPerformance(**performance_values(index)))
+        session.add(MusicAuditEvent(**audit_values(index)))
+    session.flush()
+
+
+def chunked_rows(session: Session, rows: int) -> None:
+    for start in range(0, rows, INSERT_CHUNK_ROWS):
+        indexes = range(start, min(start + INSERT_CHUNK_ROWS, rows))
+        _ = session.execute(insert(SongPerformance).values([performance_values(index) for index in indexes]))
+        _ = session.execute(insert(MusicAuditEvent).values([audit_values(index) for index in indexes]))
+
+
+def executemany_rows(session: Session, rows: int) -> None:
+    for start in range(0, rows, INSERT_CHUNK_ROWS):
+        indexes = range(start, min(start + INSERT_CHUNK_ROWS, rows))
+        _ = session.execute(insert(SongPerformance), [performance_values(index) for index in indexes])
+        _ = session.execute(insert(MusicAuditEvent), [audit_values(index) for index in indexes])
+
+
+def timed_insert(label: str, rows: int, callback) -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, 1000, 1)
+        started = time.perf_counter()
+        callback(session, rows)
+        session.commit()
+        print(f"{label:<36} {time.perf_counter() - started:>9.3f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    contents = build_workbook(args.rows, 1000)
+    print(f"workbook {len(contents) / 1024 / 1024:.1f} MiB, {args.rows} rows")
+    started = time.perf_counter()
+    _ = parse_performance_workbook(contents)
+    print(f"{'parse on event loop (blocked)':<36} {time.perf_counter() - started:>9.3f} s")
+    elapsed, stall = asyncio.run(loop_stall(contents))
+    print(f"{'parse in worker thread':<36} {elapsed:>9.3f} s  max loop stall {stall * 1000:.1f} ms")
+    timed_insert("ORM add per row", args.rows, orm_rows)
+    timed_insert(f"Core insert().values x{INSERT_CHUNK_ROWS}", args.rows, chunked_rows)
+    timed_insert(f"Core insert() executemany x{INSERT_CHUNK_ROWS}", args.rows, executemany_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, func, insert, select, update  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models.music import Song, SongPerformance  # noqa: E402
+from app.services.music_aggregates import song_aggregate_values  # noqa: E402
+
+
+def seed(session: Session, song_count: int, performance_count: int) -> None:
+    rng = random.Random(31)
+    _ = session.execute(
+        insert(Song),
+        [
+            {
+                "song_id": song_id,
+                "source_key": f"song_{song_id}",
+                "title": f"歌曲{rng.getrandbits(32):08x}",
+                "artist": "歌手",
+                "artists": ["歌手"],
+                "genre": rng.choice(("华语流行", "日语流行", "古风")),
+                "language": rng.choice(("国语", "日语", "粤语")),
+                "work_type": "翻唱",
+                "notes": "",
+                "status": "active",
+            }
+            for song_id in range(1, song_count + 1)
+        ],
+    )
+    start = date(2020, 1, 1)
+    _ = session.execute(
+        insert(SongPerformance),
+        [
+            {
+                "source_key": f"performance_{index}",
+                "song_id": rng.randint(1, song_count),
+                "performed_on": start + timedelta(days=rng.randint(0, 2000)),
+                "platform": "哔哩哔哩",
+            }
+            for index in range(performance_count)
+        ],
+    )
+    session.commit()
+
+
+def legacy_page(session: Session, sort: str) -> None:
+    count_subquery = (
+        select(func.count(SongPerformance.performance_id))
+        .where(SongPerformance.song_id == Song.song_id)
+        .correlate(Song)
+        .scalar_subquery()
+    )
+    latest_id_subquery = (
+        select(SongPerformance.performance_id)
+        .where(SongPerformance.song_id == Song.song_id)
+        .order_by(SongPerformance.performed_on.desc(), SongPerformance.performance_id.desc())
+        .limit(1)
+        .correlate(Song)
+        .scalar_subquery()
+    )
+    latest_date_subquery = (
+        select(SongPerformance.performed_on)
+        .where(SongPerformance.song_id == Song.song_id)
+        .order_by(SongPerformance.performed_on.desc())
+        .limit(1)
+        .correlate(Song)
+        .scalar_subquery()
+    )
+    ordering = {"title": Song.title, "recent": latest_date_subquery, "count": count_subquery}[sort]
+    _ = session.execute(
+        select(Song, count_subquery, SongPerformance)
+        .outerjoin(SongPerformance, SongPerformance.performance_id == latest_id_subquery)
+        .where(Song.status == "active")
+        .order_by(ordering.desc(), Song.song_id)
+        .limit(30)
+    ).all()
+
+
+def denormalized_page(session: Session, sort: str) -> None:
+    ordering = {"title": Song.title, "recent": Song.latest_performed_on, "count": Song.performance_count}[sort]
+    _ = session.execute(
+        select(Song, SongPerformance)
+        .outerjoin(SongPerformance, SongPerformance.performance_id == Song.latest_performance_id)
+        .where(Song.status == "active")
+        .order_by(ordering.desc(), Song.song_id)
+        .limit(30)
+    ).all()
+
+
+def refresh_all(session: Session) -> None:
+    _ = session.execute(update(Song).values(**song_aggregate_values()))
+    session.commit()
+
+
+def timed(label: str, runs: int, callback) -> None:
+    started = time.perf_counter()
+    for _ in range(runs):
+        callback()
+    print(f"{label:<28} {(time.perf_counter() - started) / runs * 1000:>9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="sqlite://", help="同步 SQLAlchemy URL，默认内存 SQLite")
+    parser.add_argument("--songs", type=int, default=10_000)
+    parser.add_argument("--performances", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, args.songs, args.performances)
+        timed("refresh aggregates (all)", 1, lambda: refresh_all(session))
+        for sort in ("title", "recent", "count"):
+            timed(f"legacy sort={sort}", args.runs, lambda: legacy_page(session, sort))
+            timed(f"denormalized sort={sort}", args.runs, lambda: denormalized_page(session, sort))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import random
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models.music import Song, SongPerformance  # noqa: E402
+from app.services.music_catalog import CatalogQuery, CatalogSnapshot, build_snapshot  # noqa: E402
+from app.services.music_facets import CatalogSummary  # noqa: E402
+from app.services.music_random import SamplerCache, _weights  # noqa: E402
+from music_list import refresh_all, seed  # noqa: E402
+
+
+def load(session: Session) -> CatalogSnapshot:
+    rows = session.execute(
+        select(
+            Song.song_id,
+            Song.source_key,
+            Song.title,
+            Song.artist,
+            Song.artists,
+            Song.genre,
+            Song.language,
+            Song.work_type,
+            Song.notes,
+            Song.metadata_status,
+            Song.performance_count,
+            Song.latest_performed_on,
+            SongPerformance.clip_url.label("latest_link"),
+        )
+        .outerjoin(SongPerformance, SongPerformance.performance_id == Song.latest_performance_id)
+        .where(Song.status == "active")
+    ).all()
+    return build_snapshot(1, rows, CatalogSummary(1, {}, len(rows), 0, 0, 0))
+
+
+def timed(label: str, runs: int, callback) -> None:
+    started = time.perf_counter()
+    for _ in range(runs):
+        callback()
+    print(f"{label:<36} {(time.perf_counter() - started) / runs * 1000:>9.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--songs", type=int, default=10_000)
+    parser.add_argument("--performances", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, args.songs, args.performances)
+        refresh_all(session)
+        timed("load + build snapshot", 1, lambda: load(session))
+        snapshot = load(session)
+
+    queries = {
+        "sort=title page=1": (CatalogQuery(), 0),
+        "sort=recent desc page=100": (CatalogQuery(sort="recent", order="desc"), 2970),
+        "sort=count genre+language": (CatalogQuery(sort="count", genre="古风", language="粤语"), 0),
+        "q=ab sort=count desc": (CatalogQuery(q="ab", sort="count", order="desc"), 0),
+        "q=7c1e2 relevance (typo)": (CatalogQuery(q="7c1e2", sort="relevance"), 0),
+        "q=gs3f all relevance (pinyin)": (CatalogQuery(q="gs3f", search_mode="all", sort="relevance"), 0),
+        "q=歌曲 relevance (every song)": (CatalogQuery(q="歌曲", sort="relevance"), 0),
+    }
+    for label, (query, offset) in queries.items():
+        timed(label, args.runs, lambda: snapshot.query(query, offset, 30))
+
+    rng = random.Random(7)
+    today = date.today()
+    for weight in ("inverse_count", "days_since"):
+        timed(f"random {weight}: build prefix sums", 1, lambda: SamplerCache().get(snapshot, CatalogQuery(), weight, today))
+        sampler = SamplerCache().get(snapshot, CatalogQuery(), weight, today)
+        timed(f"random {weight}: prefix-sum pick", args.runs, lambda: sampler.pick(rng, set()))
+        indexes = snapshot.matching(CatalogQuery())
+        timed(
+            f"random {weight}: choices() per pick",
+            args.runs,
+            lambda: rng.choices(indexes, weights=_weights(snapshot, indexes, weight, today.toordinal())),
+        )
+
+
+if __name__ == "__main__":
+    main()
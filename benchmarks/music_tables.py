@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.api.music import _export_chunks  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.services.music_tables import parquet_available, table_chunks  # noqa: E402
+from music_list import seed  # noqa: E402
+
+
+async def measure(
+    factory: async_sessionmaker[AsyncSession],
+    label: str,
+    build: Callable[[AsyncSession], AsyncIterator[bytes]],
+    trace_memory: bool,
+) -> None:
+    async with factory() as session:
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        size = 0
+        async for chunk in build(session):
+            size += len(chunk)
+        elapsed = time.perf_counter() - started
+        line = f"{label:<28} {elapsed:>8.3f} s {size / 1024 / 1024:>8.1f} MiB"
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            line += f"  peak {peak / 1024 / 1024:>6.1f} MiB"
+    print(line)
+
+
+async def run(url: str, trace_memory: bool) -> None:
+    engine = create_async_engine(url)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    await measure(factory, "/music/export JSON", lambda session: _export_chunks(session, 1), trace_memory)
+    formats = ("csv", "parquet") if parquet_available() else ("csv",)
+    for fmt in formats:
+        for table in ("songs", "performances"):
+            await measure(factory, f"{table} {fmt}", lambda session: table_chunks(session, table, fmt), trace_memory)
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--songs", type=int, default=10_000)
+    parser.add_argument("--performances", type=int, default=300_000)
+    parser.add_argument("--trace-memory", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "music.db"
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            seed(session, args.songs, args.performances)
+            session.commit()
+        engine.dispose()
+        print(f"{args.songs} songs, {args.performances} performances")
+        asyncio.run(run(f"sqlite+aiosqlite:///{path}", args.trace_memory))
+
+
+if __name__ == "__main__":
+    main()
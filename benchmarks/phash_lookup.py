@@ -0,0 +1,45 @@
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.image_hash import MultiIndexHash  # noqa: E402
+
+
+SIZES = (1_000, 10_000, 100_000, 500_000)
+QUERIES = 2_000
+MAX_DISTANCE = 6
+
+
+def _near(value: int, flips: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), flips):
+        value ^= 1 << bit
+    return value
+
+
+def main() -> None:
+    rng = random.Random(20260718)
+    print(f"{'size':>8} {'hit_us':>10} {'miss_us':>10} {'build_s':>8}")
+    for size in SIZES:
+        hashes = [rng.getrandbits(64) for _ in range(size)]
+        started = time.perf_counter()
+        index = MultiIndexHash(MAX_DISTANCE)
+        for image_id, value in enumerate(hashes):
+            index.add(value, image_id)
+        build_seconds = time.perf_counter() - started
+
+        hits = [_near(rng.choice(hashes), rng.randint(0, MAX_DISTANCE), rng) for _ in range(QUERIES)]
+        misses = [rng.getrandbits(64) for _ in range(QUERIES)]
+        timings = []
+        for queries in (hits, misses):
+            started = time.perf_counter()
+            for value in queries:
+                _ = index.nearest(value)
+            timings.append((time.perf_counter() - started) / QUERIES * 1_000_000)
+        print(f"{size:>8} {timings[0]:>10.1f} {timings[1]:>10.1f} {build_seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
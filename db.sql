@@ -45,8 +45,15 @@ CREATE TABLE IF NOT EXISTS messages (
   created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   INDEX idx_messages_ip_created (ip_address, created_at),
   INDEX idx_messages_status_created (status, created_at),
-  INDEX idx_messages_tag (tag)
+  INDEX idx_messages_created (created_at, message_id),
+  INDEX idx_messages_tag (tag),
+  FULLTEXT INDEX ftx_messages_text (message_text) WITH PARSER ngram
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+-- 已有库升级：以下语句可重复执行，仅补齐缺失的列与索引
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'messages' AND INDEX_NAME = 'ftx_messages_text'), 'DO 0', 'ALTER TABLE messages ADD FULLTEXT INDEX ftx_messages_text (message_text) WITH PARSER ngram');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'messages' AND INDEX_NAME = 'idx_messages_created'), 'DO 0', 'ALTER TABLE messages ADD INDEX idx_messages_created (created_at, message_id)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
 
 CREATE TABLE IF NOT EXISTS images (
   image_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -54,13 +61,58 @@ CREATE TABLE IF NOT EXISTS images (
   image_path VARCHAR(255) NOT NULL,
   thumb_path VARCHAR(255) NULL,
   jpg_path VARCHAR(255) NULL,
+  phash BIGINT UNSIGNED NULL,
+  duplicate_of INT NULL,
   uploaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   INDEX idx_images_message_id (message_id),
+  INDEX idx_images_phash (phash),
   CONSTRAINT fk_images_message_id
     FOREIGN KEY (message_id)
     REFERENCES messages (message_id)
     ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+-- 已有库升级：以下语句可重复执行，仅补齐缺失的列与索引
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'images' AND COLUMN_NAME = 'phash'), 'DO 0', 'ALTER TABLE images ADD COLUMN phash BIGINT UNSIGNED NULL AFTER jpg_path');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'images' AND COLUMN_NAME = 'duplicate_of'), 'DO 0', 'ALTER TABLE images ADD COLUMN duplicate_of INT NULL AFTER phash');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'images' AND INDEX_NAME = 'idx_images_phash'), 'DO 0', 'ALTER TABLE images ADD INDEX idx_images_phash (phash)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+
+CREATE TABLE IF NOT EXISTS messages_archive (
+  message_id INT NOT NULL,
+  archive_month INT NOT NULL,
+  ip_address VARCHAR(45) NOT NULL,
+  message_text TEXT NULL,
+  tag VARCHAR(255) NULL,
+  status ENUM('pending', 'approved', 'archived', 'delete') NOT NULL,
+  created_at TIMESTAMP NOT NULL,
+  archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (message_id, archive_month),
+  INDEX idx_messages_archive_status_created (status, created_at),
+  INDEX idx_messages_archive_created (created_at, message_id),
+  INDEX idx_messages_archive_tag (tag)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+PARTITION BY RANGE (archive_month) (PARTITION pmax VALUES LESS THAN MAXVALUE);
+-- 已有库升级：以下语句可重复执行，仅补齐缺失的列与索引
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'messages_archive' AND INDEX_NAME = 'idx_messages_archive_created'), 'DO 0', 'ALTER TABLE messages_archive ADD INDEX idx_messages_archive_created (created_at, message_id)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+
+CREATE TABLE IF NOT EXISTS images_archive (
+  image_id INT NOT NULL,
+  archive_month INT NOT NULL,
+  message_id INT NOT NULL,
+  image_path VARCHAR(255) NOT NULL,
+  thumb_path VARCHAR(255) NULL,
+  jpg_path VARCHAR(255) NULL,
+  phash BIGINT UNSIGNED NULL,
+  duplicate_of INT NULL,
+  uploaded_at TIMESTAMP NOT NULL,
+  PRIMARY KEY (image_id, archive_month),
+  INDEX idx_images_archive_message_id (message_id),
+  INDEX idx_images_archive_phash (phash)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+PARTITION BY RANGE (archive_month) (PARTITION pmax VALUES LESS THAN MAXVALUE);
 
 CREATE TABLE IF NOT EXISTS tags (
   tag_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -79,20 +131,87 @@ CREATE TABLE IF NOT EXISTS downloads (
 
 CREATE TABLE IF NOT EXISTS songs (
   song_id INT AUTO_INCREMENT PRIMARY KEY, source_key VARCHAR(80) NOT NULL UNIQUE,
-  title VARCHAR(255) NOT NULL, artist VARCHAR(500) NOT NULL, artists JSON NOT NULL,
+  title VARCHAR(255) NOT NULL, title_key VARCHAR(255) NOT NULL DEFAULT '', artist VARCHAR(500) NOT NULL, artists JSON NOT NULL,
   genre VARCHAR(100) NOT NULL, language VARCHAR(50) NOT NULL, work_type VARCHAR(50) NOT NULL,
   notes TEXT NOT NULL, metadata_status VARCHAR(30) NOT NULL DEFAULT 'complete',
   status VARCHAR(20) NOT NULL DEFAULT 'active', version INT NOT NULL DEFAULT 1,
+  performance_count INT NOT NULL DEFAULT 0, latest_performance_id INT NULL, latest_performed_on DATE NULL,
   created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-  INDEX idx_songs_status (status), INDEX idx_songs_filters (genre, language, work_type)
+  INDEX idx_songs_status (status), INDEX idx_songs_filters (genre, language, work_type),
+  INDEX idx_songs_status_title (status, title), INDEX idx_songs_status_latest (status, latest_performed_on),
+  INDEX idx_songs_status_count (status, performance_count), INDEX idx_songs_title_key (title_key)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+-- 已有库升级：以下语句可重复执行，仅补齐缺失的列与索引
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND COLUMN_NAME = 'title_key'), 'DO 0', 'ALTER TABLE songs ADD COLUMN title_key VARCHAR(255) NOT NULL DEFAULT '''' AFTER title');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND COLUMN_NAME = 'performance_count'), 'DO 0', 'ALTER TABLE songs ADD COLUMN performance_count INT NOT NULL DEFAULT 0 AFTER version');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND COLUMN_NAME = 'latest_performance_id'), 'DO 0', 'ALTER TABLE songs ADD COLUMN latest_performance_id INT NULL AFTER performance_count');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND COLUMN_NAME = 'latest_performed_on'), 'DO 0', 'ALTER TABLE songs ADD COLUMN latest_performed_on DATE NULL AFTER latest_performance_id');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND INDEX_NAME = 'idx_songs_status_title'), 'DO 0', 'ALTER TABLE songs ADD INDEX idx_songs_status_title (status, title)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND INDEX_NAME = 'idx_songs_status_latest'), 'DO 0', 'ALTER TABLE songs ADD INDEX idx_songs_status_latest (status, latest_performed_on)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND INDEX_NAME = 'idx_songs_status_count'), 'DO 0', 'ALTER TABLE songs ADD INDEX idx_songs_status_count (status, performance_count)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND INDEX_NAME = 'idx_songs_title_key'), 'DO 0', 'ALTER TABLE songs ADD INDEX idx_songs_title_key (title_key)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+CREATE TABLE IF NOT EXISTS song_artists (
+  song_id INT NOT NULL, artist VARCHAR(255) COLLATE utf8mb4_bin NOT NULL,
+  PRIMARY KEY (song_id, artist), INDEX idx_song_artists_artist (artist, song_id),
+  CONSTRAINT fk_song_artists_song FOREIGN KEY (song_id) REFERENCES songs(song_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 CREATE TABLE IF NOT EXISTS song_performances (
   performance_id INT AUTO_INCREMENT PRIMARY KEY, source_key VARCHAR(80) NOT NULL UNIQUE, song_id INT NOT NULL,
   performed_on DATE NOT NULL, platform VARCHAR(100) NOT NULL, stream_id VARCHAR(100) NULL, stream_title VARCHAR(255) NULL,
   stream_url VARCHAR(2048) NULL, clip_url VARCHAR(2048) NULL, created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, INDEX idx_performances_song_date (song_id, performed_on),
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, INDEX idx_performances_song_date_stream (song_id, performed_on, stream_id),
+  INDEX idx_performances_stream_date (stream_id, performed_on),
   CONSTRAINT fk_song_performances_song FOREIGN KEY (song_id) REFERENCES songs(song_id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+-- 已有库升级：以下语句可重复执行，仅补齐缺失的列与索引
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'song_performances' AND INDEX_NAME = 'idx_performances_song_date_stream'), 'DO 0', 'ALTER TABLE song_performances ADD INDEX idx_performances_song_date_stream (song_id, performed_on, stream_id)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'song_performances' AND INDEX_NAME = 'idx_performances_stream_date'), 'DO 0', 'ALTER TABLE song_performances ADD INDEX idx_performances_stream_date (stream_id, performed_on)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(NOT EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'song_performances' AND INDEX_NAME = 'idx_performances_song_date'), 'DO 0', 'ALTER TABLE song_performances DROP INDEX idx_performances_song_date');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+CREATE TABLE IF NOT EXISTS song_performance_monthly (
+  song_id INT NOT NULL, month INT NOT NULL, performance_count INT NOT NULL, first_performed_on DATE NOT NULL, last_performed_on DATE NOT NULL,
+  PRIMARY KEY (song_id, month), INDEX idx_performance_monthly_month_count (month, performance_count),
+  CONSTRAINT fk_performance_monthly_song FOREIGN KEY (song_id) REFERENCES songs(song_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 CREATE TABLE IF NOT EXISTS music_catalog_revision (id INT PRIMARY KEY, revision INT NOT NULL DEFAULT 0, updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 INSERT IGNORE INTO music_catalog_revision (id, revision) VALUES (1, 0);
-CREATE TABLE IF NOT EXISTS music_audit_events (audit_id INT AUTO_INCREMENT PRIMARY KEY, actor VARCHAR(255) NOT NULL, action VARCHAR(80) NOT NULL, entity_type VARCHAR(40) NOT NULL, entity_id VARCHAR(100) NOT NULL, details JSON NOT NULL, created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, INDEX idx_music_audit_created (created_at)) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+CREATE TABLE IF NOT EXISTS music_audit_events (audit_id INT AUTO_INCREMENT PRIMARY KEY, actor VARCHAR(255) NOT NULL, action VARCHAR(80) NOT NULL, entity_type VARCHAR(40) NOT NULL, entity_id VARCHAR(100) NOT NULL, details JSON NOT NULL, revision INT NULL DEFAULT 0, created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, INDEX idx_music_audit_created (created_at), INDEX idx_music_audit_revision (revision), INDEX idx_music_audit_actor (actor, audit_id), INDEX idx_music_audit_action (action, audit_id), INDEX idx_music_audit_entity (entity_type, entity_id, audit_id)) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+-- 已有库升级：以下语句可重复执行，仅补齐缺失的列与索引
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'music_audit_events' AND COLUMN_NAME = 'revision'), 'DO 0', 'ALTER TABLE music_audit_events ADD COLUMN revision INT NULL AFTER details');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+ALTER TABLE music_audit_events ALTER COLUMN revision SET DEFAULT 0;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'music_audit_events' AND INDEX_NAME = 'idx_music_audit_revision'), 'DO 0', 'ALTER TABLE music_audit_events ADD INDEX idx_music_audit_revision (revision)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'music_audit_events' AND INDEX_NAME = 'idx_music_audit_actor'), 'DO 0', 'ALTER TABLE music_audit_events ADD INDEX idx_music_audit_actor (actor, audit_id)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'music_audit_events' AND INDEX_NAME = 'idx_music_audit_action'), 'DO 0', 'ALTER TABLE music_audit_events ADD INDEX idx_music_audit_action (action, audit_id)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+SET @ddl = IF(EXISTS (SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'music_audit_events' AND INDEX_NAME = 'idx_music_audit_entity'), 'DO 0', 'ALTER TABLE music_audit_events ADD INDEX idx_music_audit_entity (entity_type, entity_id, audit_id)');
+PREPARE ddl FROM @ddl; EXECUTE ddl; DEALLOCATE PREPARE ddl;
+CREATE TABLE IF NOT EXISTS music_audit_archive (
+  audit_id INT NOT NULL,
+  archive_month INT NOT NULL,
+  actor VARCHAR(255) NOT NULL,
+  action VARCHAR(80) NOT NULL,
+  entity_type VARCHAR(40) NOT NULL,
+  entity_id VARCHAR(100) NOT NULL,
+  details JSON NOT NULL,
+  revision INT NULL,
+  created_at DATETIME NOT NULL,
+  archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (audit_id, archive_month),
+  INDEX idx_music_audit_archive_actor (actor, audit_id),
+  INDEX idx_music_audit_archive_action (action, audit_id),
+  INDEX idx_music_audit_archive_entity (entity_type, entity_id, audit_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (archive_month) (PARTITION pmax VALUES LESS THAN MAXVALUE);